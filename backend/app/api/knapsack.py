@@ -1,10 +1,35 @@
 from fastapi import APIRouter
-from app.models.knapsack import KnapsackRequest, KnapsackResponse
+from app.models.knapsack import (
+    KnapsackParetoRequest, KnapsackParetoResponse, KnapsackRequest, KnapsackResponse,
+    KnapsackSweepRequest, KnapsackSweepResponse,
+)
 from app.services.knapsack_service import MultiObjectiveKnapsack
 
 router = APIRouter()
 
 @router.post("/solve", response_model=KnapsackResponse)
 async def solve_knapsack(body: KnapsackRequest):
-    result = await MultiObjectiveKnapsack.solve(body.budget, body.items)
+    result = await MultiObjectiveKnapsack.solve(
+        body.budget, body.items, body.solver, body.epsilon
+    )
+    return result
+
+@router.post("/sweep", response_model=KnapsackSweepResponse)
+async def sweep_knapsack(body: KnapsackSweepRequest):
+    """
+    Mejor canasta para varios presupuestos (p.ej. el slider del frontend)
+    a partir de una sola resolución.
+    """
+    result = await MultiObjectiveKnapsack.sweep(body.items, body.budgets, body.max_budget, body.max_points)
+    return result
+
+@router.post("/pareto", response_model=KnapsackParetoResponse)
+async def pareto_knapsack(body: KnapsackParetoRequest):
+    """
+    Canastas no dominadas en costo, sustentabilidad y CO2, para elegir el
+    compromiso en el cliente sin una resolución por cada ponderación.
+    """
+    result = await MultiObjectiveKnapsack.pareto(
+        body.items, body.max_budget, body.epsilon, body.max_points
+    )
     return result
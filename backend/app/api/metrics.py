@@ -0,0 +1,84 @@
+import os
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics import Metrics
+from app.services.openfoodfacts_service import OpenFoodFactsService
+from app.services.product_cache import ProductCache
+
+router = APIRouter()
+
+# Header de la request que pide el desglose por etapa en Server-Timing
+TIMING_HEADER = os.getenv("TIMING_HEADER", "X-Timing").lower().encode()
+
+
+class MetricsMiddleware:
+    """
+    Mide cada request por ruta (plantilla, no la URL) y, si la request trae
+    el header X-Timing, devuelve el tiempo por etapa en Server-Timing.
+    Es un middleware ASGI puro para no agregar una tarea extra por request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Metrics.ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = None
+        if any(name == TIMING_HEADER for name, _ in scope["headers"]):
+            timings = Metrics.start_request_timings()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timings is not None:
+                    timings["total"] = time.perf_counter() - started
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", Metrics.server_timing_header(timings).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if timings is not None:
+                Metrics.stop_request_timings()
+            route = scope.get("route")
+            Metrics.observe(
+                "liquiverde_http_request_seconds",
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    cache = ProductCache.stats()
+    breaker = OpenFoodFactsService.stats()["breaker"]
+    body = Metrics.render(
+        gauges={
+            "liquiverde_product_cache_size": cache["size"],
+            "liquiverde_product_cache_max_size": cache["max_size"],
+            # 0 = closed, 1 = half_open, 2 = open
+            "liquiverde_upstream_breaker_state": ("closed", "half_open", "open").index(breaker["state"]),
+        },
+        counters={
+            "liquiverde_product_cache_hits_total": cache["hits"],
+            "liquiverde_product_cache_negative_hits_total": cache["negative_hits"],
+            "liquiverde_product_cache_misses_total": cache["misses"],
+            "liquiverde_product_cache_evictions_total": cache["evictions"],
+            "liquiverde_upstream_breaker_opens_total": breaker["opens"],
+        },
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,34 +1,111 @@
-from fastapi import APIRouter
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.services.openfoodfacts_service import OpenFoodFactsService
 from app.services.price_service import LocalPriceService
 from app.services.sustainability_service import SustainabilityService
 from app.services.impact_service import EnvironmentalImpactService
-from app.models.product import ProductModel
+from app.models.product import ProductBatchRequest, ProductModel, ProductSearchResponse
+from app.repositories.search_repository import ProductSearchRepository
+from app.services.product_resolver import ProductResolver
 
 router = APIRouter()
 
-@router.get("/{barcode}", response_model=ProductModel)
-async def get_product(barcode: str):
+# Debe declararse antes de /{barcode} para que "search" no se tome como barcode
+@router.get("/search", response_model=ProductSearchResponse)
+async def search_products(
+    q: Optional[str] = Query(None, description="texto a buscar en nombre y marca (por prefijo)"),
+    category: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    max_score: Optional[float] = Query(None, ge=0, le=100),
+    max_sugars: Optional[float] = Query(None, ge=0, description="g de azúcares por 100 g"),
+    max_saturated_fat: Optional[float] = Query(None, ge=0, description="g de grasa saturada por 100 g"),
+    max_salt: Optional[float] = Query(None, ge=0, description="g de sal por 100 g"),
+    max_nova_group: Optional[int] = Query(None, ge=1, le=4),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
     """
-    Devuelve información del producto usando OpenFoodFacts
-    y el precio desde un dataset local.
-    Incluye sostenibilidad e impacto ambiental.
+    Busca productos por nombre/marca en los productos guardados y en el
+    dataset de precios, con filtros opcionales por categoría, score y
+    máximos de nutrientes.
     """
-    product = await OpenFoodFactsService.get_product(barcode)
+    total, hits = await ProductSearchRepository.search(
+        q, category, min_score, max_score, limit, offset,
+        max_nutrients={
+            "sugars_100g": max_sugars,
+            "saturated_fat_100g": max_saturated_fat,
+            "salt_100g": max_salt,
+            "nova_group": max_nova_group,
+        },
+    )
 
-    # Agregar precio desde dataset local
-    price = LocalPriceService.get_price_by_barcode(barcode)
-    product.price = price
+    prices = LocalPriceService.get_prices(hit["barcode"] for hit in hits)
+    for hit in hits:
+        hit["price"] = prices[hit["barcode"]]
 
-    score = SustainabilityService.compute_score(product.nutriments)
-    product.sustainability_score = score
+    return {"total": total, "limit": limit, "offset": offset, "items": hits}
 
-    # Agregar impacto ambiental
-    impact = EnvironmentalImpactService.compute_impact(
-        product.nutriments,
-        product.name or "",
-        weight_kg=1.0
-    )
-    product.impact = impact
+def _complete_product(product: ProductModel, price: Optional[float]) -> ProductModel:
+    """Agrega precio desde dataset local, sostenibilidad e impacto ambiental"""
+    product.price = price
+
+    # Score e impacto vienen precalculados desde la BD (ver ProductScoringService)
+    if product.impact is None:
+        product.sustainability_score = SustainabilityService.compute_score(product.nutriments)
+        product.impact = EnvironmentalImpactService.compute_impact(
+            product.nutriments or {},
+            product.name or "",
+            weight_kg=1.0,
+            category=product.category
+        )
 
     return product
+
+@router.post("/batch", response_model=None)
+async def get_products_batch(body: ProductBatchRequest):
+    """
+    Resuelve varios barcodes en una llamada: lo que está en caché/BD sale
+    con una sola consulta y lo demás se pide a OpenFoodFacts en paralelo.
+
+    Con format=ndjson (por defecto) cada línea es {"barcode", "product"} o
+    {"barcode", "error"} y se envía apenas está lista (el orden es el de
+    llegada). Con format=json se devuelve un arreglo en el orden pedido.
+    """
+    prices = LocalPriceService.get_prices(body.barcodes)
+
+    def record(barcode, product, error):
+        if error is not None:
+            return {"barcode": barcode, "error": error}
+        product = _complete_product(product, prices[barcode])
+        return {"barcode": barcode, "product": product.model_dump()}
+
+    if body.format == "json":
+        resolved = await ProductResolver.resolve_many(body.barcodes)
+        return [
+            record(barcode, resolved.products.get(barcode), resolved.errors.get(barcode))
+            for barcode in dict.fromkeys(body.barcodes)
+        ]
+
+    async def lines():
+        async for barcode, product, error in ProductResolver.iter_resolved(body.barcodes):
+            yield json.dumps(record(barcode, product, error), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/{barcode}", response_model=ProductModel)
+async def get_product(
+    barcode: str,
+    full_nutriments: bool = Query(False, description="nutriments completo de OpenFoodFacts en vez del resumen"),
+):
+    """
+    Devuelve información del producto usando OpenFoodFacts
+    y el precio desde un dataset local.
+    Incluye sostenibilidad e impacto ambiental.
+    """
+    product = await OpenFoodFactsService.get_product(barcode, full_nutriments)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+    return _complete_product(product, LocalPriceService.get_price_by_barcode(barcode))
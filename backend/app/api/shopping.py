@@ -1,4 +1,7 @@
+import json
+
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from app.models.shopping_list import ShoppingListRequest, ShoppingListResponse
 from app.services.shopping_service import ShoppingOptimizer
 
@@ -6,5 +9,17 @@ router = APIRouter()
 
 @router.post("/optimize", response_model=ShoppingListResponse)
 async def optimize_shopping_list(body: ShoppingListRequest):
-    result = await ShoppingOptimizer.optimize(body.items, body.objective)
+    result = await ShoppingOptimizer.optimize(body.items, body.objective, body.alternatives)
     return result
+
+@router.post("/optimize/stream")
+async def optimize_shopping_list_stream(body: ShoppingListRequest):
+    """
+    Variante progresiva de /optimize en NDJSON: una línea por item a medida
+    que se resuelve y una línea final "summary" igual a la respuesta de /optimize.
+    """
+    async def lines():
+        async for frame in ShoppingOptimizer.optimize_stream(body.items, body.objective, body.alternatives):
+            yield json.dumps(frame, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,92 @@
+"""
+Migraciones mínimas de esquema para SQLite
+
+create_all no modifica tablas existentes, así que las columnas nuevas de
+los modelos se agregan aquí con ALTER TABLE ... ADD COLUMN (todas nullable)
+y los índices nuevos con CREATE INDEX IF NOT EXISTS. También se crea el
+índice full-text (FTS5) de productos con sus triggers.
+"""
+
+from sqlalchemy import inspect, text
+
+from app.database.database import Base, engine
+
+
+def upgrade_schema(bind=engine):
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
+# Índice full-text sobre name/brand de products (contenido externo: FTS5 guarda
+# solo el índice y lee el texto desde products por rowid). Los triggers lo
+# mantienen al día con cada insert/upsert/delete de ProductRepository.
+# catalog_fts indexa los nombres de prices.json (ver ProductSearchRepository).
+SEARCH_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, brand,
+        content='products', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, brand) VALUES (new.rowid, new.name, new.brand);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand)
+        VALUES ('delete', old.rowid, old.name, old.brand);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, brand ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand)
+        VALUES ('delete', old.rowid, old.name, old.brand);
+        INSERT INTO products_fts(rowid, name, brand) VALUES (new.rowid, new.name, new.brand);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(
+        barcode UNINDEXED, name, brand,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS search_meta (key TEXT PRIMARY KEY, value TEXT)
+    """,
+]
+
+
+def ensure_search_index(bind=engine):
+    inspector = inspect(bind)
+    is_new = not inspector.has_table("products_fts")
+    with bind.begin() as conn:
+        for statement in SEARCH_SCHEMA:
+            conn.execute(text(statement))
+        if is_new:
+            # Indexar las filas que ya existían antes de crear el índice
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+
+def init_db(bind=engine):
+    """Crea las tablas que falten y agrega las columnas nuevas"""
+    import app.database.models  # noqa: F401 (registra los modelos en Base)
+
+    Base.metadata.create_all(bind=bind)
+    upgrade_schema(bind)
+    ensure_search_index(bind)
@@ -1,14 +1,40 @@
-from sqlalchemy import Column, String, Float, Text
+from sqlalchemy import Column, String, Float, Index, Integer, LargeBinary, Text
 from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy.orm import column_property
 from app.database.database import Base
 
 class ProductDB(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Filtros de /products/search: categoría + rango de score
+        Index("ix_products_category_score", "category", "sustainability_score"),
+    )
 
     barcode = Column(String, primary_key=True, index=True)
     name = Column(String)
     brand = Column(String)
+    # Solo filas anteriores a nutrients_blob; las nuevas lo dejan en NULL
     nutrients_json = Column(Text)
-    sustainability_score = Column(Float)
+    # nutriments completo de OpenFoodFacts, JSON comprimido con zlib (NULL si
+    # venía vacío). ProductRepository no lo carga salvo que se pida.
+    nutrients_blob = Column(LargeBinary)
+    has_nutriments = column_property(nutrients_blob.isnot(None))
+    # Nutrientes que usan el score y la categorización (ver NutrientRecord),
+    # tipados para no decodificar el blob y para filtrar por rango en SQL
+    nova_group = Column(Integer, index=True)
+    sugars_100g = Column(Float, index=True)
+    saturated_fat_100g = Column(Float, index=True)
+    salt_100g = Column(Float, index=True)
+    energy_kcal_100g = Column(Float)
+    protein = Column(Float)
+    sustainability_score = Column(Float, index=True)
     price = Column(Float)
     category = Column(String)
+    # Impacto por kg precalculado y versión de las fórmulas con que se calculó
+    # score/categoría/impacto (ver ProductScoringService.FORMULA_VERSION)
+    impact_json = Column(Text)
+    formula_version = Column(Integer)
+    # Frescura: cuándo se obtuvo de OpenFoodFacts (epoch) y por cuántos
+    # segundos se considera vigente (NULL = PRODUCT_TTL_SECONDS)
+    fetched_at = Column(Float)
+    ttl_seconds = Column(Integer)
@@ -1,13 +1,25 @@
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import products, shopping, knapsack
-from app.database.database import Base, engine
-
+# Cargar .env antes de importar los servicios (leen su configuración al importarse)
 load_dotenv()
 
+from app.api import products, shopping, knapsack, metrics
+from app.api.metrics import MetricsMiddleware
+from app.database.database import async_engine
+from app.database.migrations import init_db
+from app.services.alternatives_service import AlternativesIndex
+from app.services.knapsack_solvers import DPTableTooLarge
+from app.services.openfoodfacts_service import OpenFoodFactsService
+from app.services.product_cache import ProductCache
+from app.services.product_refresher import ProductRefresher
+from app.services.solver_pool import SolverPool, SolverPoolBusy
+from app.services.upstream_guard import UpstreamError
+
 allowed_origins_raw = os.getenv("ALLOWED_ORIGINS", "*")
 
 allowed_origins = (
@@ -15,9 +27,24 @@ allowed_origins = (
     else [o.strip() for o in allowed_origins_raw.split(",")]
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    await OpenFoodFactsService.startup()
+    await SolverPool.startup()
+    await ProductRefresher.startup(OpenFoodFactsService.refresh_product)
+    await AlternativesIndex.startup()
+    yield
+    await AlternativesIndex.shutdown()
+    await ProductRefresher.shutdown()
+    await SolverPool.shutdown()
+    await OpenFoodFactsService.shutdown()
+    await async_engine.dispose()
+
 app = FastAPI(
     title="LiquiVerde API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -26,16 +53,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(products.router, prefix="/products", tags=["products"])
 app.include_router(shopping.router, prefix="/shopping-list", tags=["shopping"])
 app.include_router(knapsack.router, prefix="/knapsack", tags=["optimizer"])
+app.include_router(metrics.router, tags=["system"])
+
+@app.exception_handler(SolverPoolBusy)
+async def solver_pool_busy_handler(request: Request, exc: SolverPoolBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Optimizador ocupado, reintentar más tarde"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(DPTableTooLarge)
+async def dp_table_too_large_handler(request: Request, exc: DPTableTooLarge):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
 
-@app.on_event("startup")
-def startup_event():
-    Base.metadata.create_all(bind=engine)
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    retry_after = max(1, round(getattr(exc, "retry_after", 0) or 1))
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "OpenFoodFacts no disponible, reintentar más tarde", "reason": exc.reason},
+        headers={"Retry-After": str(retry_after)},
+    )
 
 @app.get("/health", tags=["system"])
 async def health_check():
-    return {"status": "ok", "message": "LiquiVerde API running"}
+    return {
+        "status": "ok",
+        "message": "LiquiVerde API running",
+        "product_cache": ProductCache.stats(),
+        "solver_pool": SolverPool.stats(),
+        "product_refresher": ProductRefresher.stats(),
+        "openfoodfacts": OpenFoodFactsService.stats(),
+        "alternatives_index": AlternativesIndex.stats(),
+    }
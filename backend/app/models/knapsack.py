@@ -1,16 +1,51 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
 
 class KnapsackItem(BaseModel):
     barcode: str
-    quantity: int = 1
+    quantity: int = 1  # máximo de unidades que se pueden elegir
 
 class KnapsackRequest(BaseModel):
     budget: float
     items: List[KnapsackItem]
+    # auto elige según items × presupuesto; dp y branch_and_bound son exactos
+    solver: Literal["auto", "dp", "branch_and_bound", "fptas"] = "auto"
+    epsilon: float = Field(0.05, gt=0, lt=1)  # precisión del FPTAS: valor ≥ (1 − ε)·óptimo
 
 class KnapsackResponse(BaseModel):
     best_value: float
     total_cost: float
-    items: list
+    items: list  # cada item: barcode, name, price, value, quantity (unidades elegidas), total_price
     environmental_impact: dict  # {total_co2_kg, total_water_liters, total_waste_kg, average_impact_score}
+    solver: str  # solver que se ejecutó
+    optimality_gap: float  # cota de (óptimo − best_value) / óptimo; 0 = óptimo garantizado
+    unresolved: list = []  # [{barcode, reason}] productos que no se pudieron obtener
+
+class KnapsackSweepRequest(BaseModel):
+    items: List[KnapsackItem]
+    budgets: Optional[List[float]] = Field(None, max_length=500)  # presupuestos a evaluar
+    max_budget: Optional[float] = None  # sin budgets: los quiebres de la curva hasta este monto
+    max_points: int = Field(100, ge=1, le=500)  # sin budgets: máximo de quiebres, repartidos por presupuesto
+
+    @model_validator(mode="after")
+    def check_budgets(self):
+        if not self.budgets and self.max_budget is None:
+            raise ValueError("budgets or max_budget is required")
+        return self
+
+class KnapsackSweepResponse(BaseModel):
+    points: list  # por presupuesto: budget, best_value, total_cost, items, environmental_impact, solver, optimality_gap
+    price_unit: int  # unidad de precio (CLP) usada por la DP; 1 = exacta
+    unresolved: list = []
+
+class KnapsackParetoRequest(BaseModel):
+    items: List[KnapsackItem]
+    max_budget: Optional[float] = None  # tope de costo; sin tope se exploran todas las canastas
+    epsilon: float = Field(0.01, ge=0.001, lt=1)  # resolución de la grilla (1 + ε) por objetivo
+    max_points: int = Field(100, ge=1, le=500)  # máximo de canastas en la respuesta
+
+class KnapsackParetoResponse(BaseModel):
+    points: list  # canastas no dominadas por costo: best_value, total_cost, items, environmental_impact
+    epsilon: float  # ε efectivo (puede ser mayor al pedido si la frontera era muy grande)
+    solver: str = "pareto"  # "greedy" si el solver no alcanzó: una sola canasta
+    unresolved: list = []
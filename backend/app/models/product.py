@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 class ProductModel(BaseModel):
     barcode: str
@@ -8,4 +8,26 @@ class ProductModel(BaseModel):
     nutriments: Optional[dict] = None
     sustainability_score: Optional[float] = None
     price: Optional[float] = None
-    impact: Optional[dict] = None  # {co2_kg, water_liters, waste_kg, energy_kwh, impact_score, category}
\ No newline at end of file
+    category: Optional[str] = None  # categoría de impacto ambiental (ver EnvironmentalImpactService)
+    impact: Optional[dict] = None  # por kg: {co2_kg, water_liters, waste_kg, energy_kwh, impact_score, category}
+    degraded: bool = False  # OpenFoodFacts no disponible: solo datos de prices.json, sin nutrientes
+
+class ProductSearchHit(BaseModel):
+    barcode: str
+    name: Optional[str]
+    brand: Optional[str]
+    category: Optional[str] = None
+    sustainability_score: Optional[float] = None
+    price: Optional[float] = None
+
+
+class ProductSearchResponse(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    items: List[ProductSearchHit]
+
+
+class ProductBatchRequest(BaseModel):
+    barcodes: List[str] = Field(..., min_length=1, max_length=500)
+    format: Literal["ndjson", "json"] = "ndjson"  # ndjson: una línea por producto apenas está listo
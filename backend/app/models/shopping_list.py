@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 
@@ -10,6 +10,8 @@ class ShoppingItem(BaseModel):
 class ShoppingListRequest(BaseModel):
     items: List[ShoppingItem]
     objective: str = "cheapest"  # cheapest, healthiest, balanced
+    # Sustitutos de la misma categoría por item (0 = no sugerir)
+    alternatives: int = Field(0, ge=0, le=10)
 
 
 class ShoppingListResponse(BaseModel):
@@ -18,3 +20,4 @@ class ShoppingListResponse(BaseModel):
     objective: str
     items: list
     environmental_impact: dict  # {total_co2_kg, total_water_liters, total_waste_kg, average_impact_score}
+    unresolved: list = []  # [{barcode, reason}] productos que no se pudieron obtener
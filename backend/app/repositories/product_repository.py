@@ -1,32 +1,207 @@
-from app.database.database import SessionLocal
+from app.database.database import AsyncSessionLocal, SessionLocal
 from app.database.models import ProductDB
+from app.services.metrics import Metrics
+from app.services.nutrients import NutrientRecord
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import defer
+from typing import AsyncIterator, Dict, Iterable, Iterator, List
 import json
+import time
+
+# SQLite limita la cantidad de parámetros por sentencia
+MAX_BATCH_PARAMS = 500
+
+
+def _product_query(with_nutriments: bool = False):
+    """SELECT de ProductDB; el blob de nutriments solo si se pide"""
+    query = select(ProductDB)
+    return query if with_nutriments else query.options(defer(ProductDB.nutrients_blob))
 
 class ProductRepository:
+    """Acceso síncrono a la BD (scripts y tareas fuera del event loop)"""
 
     @staticmethod
-    def get(barcode: str):
-        db = SessionLocal()
-        product = db.query(ProductDB).filter(ProductDB.barcode == barcode).first()
-        db.close()
-        return product
+    def _to_row(product_data) -> dict:
+        nutriments = product_data["nutriments"]
+        return {
+            "barcode": product_data["barcode"],
+            "name": product_data["name"],
+            "brand": product_data["brand"],
+            "nutrients_json": None,
+            "nutrients_blob": NutrientRecord.compress(nutriments),
+            **NutrientRecord.from_nutriments(nutriments).columns(),
+            "sustainability_score": product_data["sustainability_score"],
+            "price": product_data["price"],
+            "category": product_data.get("category"),
+            "impact_json": json.dumps(product_data["impact"]) if product_data.get("impact") else None,
+            "formula_version": product_data.get("formula_version"),
+            "fetched_at": product_data.get("fetched_at") or time.time(),
+            "ttl_seconds": product_data.get("ttl_seconds"),
+        }
 
     @staticmethod
-    def save(product_data):
-        db = SessionLocal()
-        obj = ProductDB(
-            barcode = product_data["barcode"],
-            name = product_data["name"],
-            brand = product_data["brand"],
-            nutrients_json = json.dumps(product_data["nutriments"]),
-            sustainability_score = product_data["sustainability_score"],
-            price = product_data["price"],
-            category = product_data.get("category")
+    def _upsert_statement():
+        stmt = insert(ProductDB)
+        return stmt.on_conflict_do_update(
+            index_elements=[ProductDB.barcode],
+            set_={
+                column.name: stmt.excluded[column.name]
+                for column in ProductDB.__table__.columns
+                if not column.primary_key
+            },
         )
-        db.add(obj)
-        db.commit()
-        db.close()
+
+    @staticmethod
+    @Metrics.timed("liquiverde_db_query_seconds", op="get")
+    def get(barcode: str, with_nutriments: bool = False):
+        with SessionLocal() as db:
+            return db.scalars(
+                _product_query(with_nutriments).where(ProductDB.barcode == barcode)
+            ).first()
+
+    @staticmethod
+    @Metrics.timed("liquiverde_db_query_seconds", op="get_many")
+    def get_many(barcodes: Iterable[str]) -> Dict[str, ProductDB]:
+        """Busca varios barcodes con una consulta IN (una por cada 500 barcodes)"""
+        unique = list(dict.fromkeys(barcodes))
+        found = {}
+        with SessionLocal() as db:
+            for start in range(0, len(unique), MAX_BATCH_PARAMS):
+                chunk = unique[start:start + MAX_BATCH_PARAMS]
+                for product in db.scalars(_product_query().where(ProductDB.barcode.in_(chunk))):
+                    found[product.barcode] = product
+        return found
+
+    @staticmethod
+    def save(product_data):
+        ProductRepository.save_many([product_data])
+
+    @staticmethod
+    @Metrics.timed("liquiverde_db_query_seconds", op="save_many")
+    def save_many(products: List[dict]):
+        """
+        Inserta o actualiza (upsert por barcode) un lote de productos en una
+        sola transacción. Dos requests que guardan el mismo barcode nuevo ya
+        no fallan por clave primaria duplicada.
+        """
+        rows = [ProductRepository._to_row(p) for p in products]
+        if not rows:
+            return
+        with SessionLocal() as db:
+            db.execute(ProductRepository._upsert_statement(), rows)
+            db.commit()
 
     @staticmethod
     def exists(barcode: str):
         return ProductRepository.get(barcode) is not None
+
+    @staticmethod
+    def iter_batches(batch_size: int = 1000, *criteria,
+                     with_nutriments: bool = False) -> Iterator[List[ProductDB]]:
+        """
+        Recorre la tabla en lotes ordenados por barcode (paginación por clave,
+        sin OFFSET), opcionalmente filtrando con criterios SQLAlchemy.
+        """
+        last = None
+        while True:
+            with SessionLocal() as db:
+                query = _product_query(with_nutriments).where(*criteria).order_by(ProductDB.barcode).limit(batch_size)
+                if last is not None:
+                    query = query.where(ProductDB.barcode > last)
+                batch = list(db.scalars(query))
+            if not batch:
+                return
+            last = batch[-1].barcode
+            yield batch
+
+    @staticmethod
+    @Metrics.timed("liquiverde_db_query_seconds", op="update_many")
+    def update_many(rows: List[dict]):
+        """Actualiza columnas de varias filas existentes (cada dict incluye barcode)"""
+        if not rows:
+            return
+        with SessionLocal() as db:
+            db.execute(update(ProductDB), rows)
+            db.commit()
+
+
+class AsyncProductRepository:
+    """
+    Misma API que ProductRepository sobre AsyncSession (aiosqlite), para
+    usar desde los handlers async sin bloquear el event loop.
+    """
+
+    @staticmethod
+    @Metrics.timed("liquiverde_db_query_seconds", op="get")
+    async def get(barcode: str, with_nutriments: bool = False):
+        async with AsyncSessionLocal() as db:
+            result = await db.scalars(
+                _product_query(with_nutriments).where(ProductDB.barcode == barcode)
+            )
+            return result.first()
+
+    @staticmethod
+    @Metrics.timed("liquiverde_db_query_seconds", op="get_many")
+    async def get_many(barcodes: Iterable[str]) -> Dict[str, ProductDB]:
+        unique = list(dict.fromkeys(barcodes))
+        found = {}
+        async with AsyncSessionLocal() as db:
+            for start in range(0, len(unique), MAX_BATCH_PARAMS):
+                chunk = unique[start:start + MAX_BATCH_PARAMS]
+                result = await db.scalars(_product_query().where(ProductDB.barcode.in_(chunk)))
+                for product in result:
+                    found[product.barcode] = product
+        return found
+
+    @staticmethod
+    async def iter_scored(batch_size: int = 1000) -> AsyncIterator[list]:
+        """
+        Filas (barcode, name, category, sustainability_score, price) de los
+        productos con categoría y score, en lotes por barcode
+        """
+        columns = (ProductDB.barcode, ProductDB.name, ProductDB.category,
+                   ProductDB.sustainability_score, ProductDB.price)
+        last = None
+        while True:
+            query = (
+                select(*columns)
+                .where(ProductDB.category.isnot(None), ProductDB.sustainability_score.isnot(None))
+                .order_by(ProductDB.barcode)
+                .limit(batch_size)
+            )
+            if last is not None:
+                query = query.where(ProductDB.barcode > last)
+            async with AsyncSessionLocal() as db:
+                batch = (await db.execute(query)).all()
+            if not batch:
+                return
+            last = batch[-1].barcode
+            yield batch
+
+    @staticmethod
+    async def save(product_data):
+        await AsyncProductRepository.save_many([product_data])
+
+    @staticmethod
+    @Metrics.timed("liquiverde_db_query_seconds", op="save_many")
+    async def save_many(products: List[dict]):
+        rows = [ProductRepository._to_row(p) for p in products]
+        if not rows:
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(ProductRepository._upsert_statement(), rows)
+            await db.commit()
+
+    @staticmethod
+    async def exists(barcode: str):
+        return await AsyncProductRepository.get(barcode) is not None
+
+    @staticmethod
+    @Metrics.timed("liquiverde_db_query_seconds", op="update_many")
+    async def update_many(rows: List[dict]):
+        if not rows:
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(ProductDB), rows)
+            await db.commit()
@@ -0,0 +1,159 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.database.database import AsyncSessionLocal
+from app.services.price_service import LocalPriceService
+
+# Columnas de products que puede devolver una búsqueda
+_HIT_COLUMNS = "p.barcode, p.name, p.brand, p.category, p.sustainability_score"
+
+
+class ProductSearchRepository:
+    """
+    Búsqueda por texto sobre products_fts (productos guardados) y
+    catalog_fts (nombres de prices.json), con filtros por categoría, rango
+    de score y máximos de nutrientes que usan los índices de products.
+    """
+
+    # Snapshot de prices.json ya indexado en catalog_fts por este proceso
+    _catalog_version: Optional[str] = None
+
+    @staticmethod
+    def _match_expression(q: str) -> Optional[str]:
+        """'leche ent' -> '"leche"* "ent"*' (todas las palabras, por prefijo)"""
+        tokens = re.findall(r"\w+", q or "")
+        if not tokens:
+            return None
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    @classmethod
+    async def _sync_catalog(cls, db):
+        """Reindexa catalog_fts si prices.json cambió desde la última vez"""
+        version = repr(LocalPriceService.version())
+        if cls._catalog_version == version:
+            return
+
+        indexed = await db.scalar(text("SELECT value FROM search_meta WHERE key = 'catalog_version'"))
+        if indexed != version:
+            await db.execute(text("DELETE FROM catalog_fts"))
+            await db.execute(
+                text("INSERT INTO catalog_fts(barcode, name, brand) VALUES (:barcode, :name, :brand)"),
+                [
+                    {"barcode": item["barcode"], "name": item.get("name"), "brand": item.get("brand")}
+                    for item in LocalPriceService.all_items()
+                    if item.get("barcode")
+                ],
+            )
+            await db.execute(
+                text("INSERT INTO search_meta(key, value) VALUES ('catalog_version', :version) "
+                     "ON CONFLICT(key) DO UPDATE SET value = excluded.value"),
+                {"version": version},
+            )
+            await db.commit()
+        cls._catalog_version = version
+
+    @staticmethod
+    def _filters(category, min_score, max_score, max_nutrients=None) -> Tuple[List[str], dict]:
+        """max_nutrients: {columna tipada de ProductDB: máximo}, p.ej. {"sugars_100g": 5}"""
+        clauses, params = [], {}
+        if category is not None:
+            clauses.append("p.category = :category")
+            params["category"] = category
+        if min_score is not None:
+            clauses.append("p.sustainability_score >= :min_score")
+            params["min_score"] = min_score
+        if max_score is not None:
+            clauses.append("p.sustainability_score <= :max_score")
+            params["max_score"] = max_score
+        for column, maximum in (max_nutrients or {}).items():
+            if maximum is not None:
+                clauses.append(f"p.{column} <= :max_{column}")
+                params[f"max_{column}"] = maximum
+        return clauses, params
+
+    @classmethod
+    async def search(cls, q: Optional[str] = None, category: Optional[str] = None,
+                     min_score: Optional[float] = None, max_score: Optional[float] = None,
+                     limit: int = 20, offset: int = 0,
+                     max_nutrients: Optional[Dict[str, float]] = None) -> Tuple[int, List[dict]]:
+        """
+        Returns:
+            (total de resultados, página de resultados ordenada por relevancia
+             bm25, o por score descendente si no hay texto)
+        """
+        match = cls._match_expression(q)
+        clauses, params = cls._filters(category, min_score, max_score, max_nutrients)
+        params.update({"limit": limit, "offset": offset})
+        filtered = bool(clauses)
+
+        async with AsyncSessionLocal() as db:
+            if match is None:
+                # Sin texto: solo filtros, resueltos con los índices de products
+                where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+                source = f"FROM products p {where}"
+                page_sql = f"""
+                    SELECT {_HIT_COLUMNS}
+                    {source}
+                    ORDER BY p.sustainability_score DESC, p.barcode
+                    LIMIT :limit OFFSET :offset
+                """
+                count_sql = f"SELECT COUNT(*) {source}"
+            else:
+                await cls._sync_catalog(db)
+                params["match"] = match
+                # Un barcode puede estar en ambos índices: se queda con el mejor rank.
+                # Con filtros solo califican los productos guardados (tienen categoría/score).
+                catalog_hits = "" if filtered else """
+                        UNION ALL
+                        SELECT barcode, bm25(catalog_fts) AS rank
+                        FROM catalog_fts WHERE catalog_fts MATCH :match
+                """
+                join = "JOIN" if filtered else "LEFT JOIN"
+                where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+                ctes = f"""
+                    WITH hits AS MATERIALIZED (
+                        SELECT p.barcode AS barcode, bm25(products_fts) AS rank
+                        FROM products_fts JOIN products p ON p.rowid = products_fts.rowid
+                        WHERE products_fts MATCH :match
+                        {catalog_hits}
+                    ), best AS (
+                        SELECT barcode, MIN(rank) AS rank FROM hits GROUP BY barcode
+                    )
+                """
+                source = f"""
+                    FROM best
+                    {join} products p ON p.barcode = best.barcode
+                    {where}
+                """
+                page_sql = f"""
+                    {ctes}
+                    SELECT best.barcode AS barcode, p.name AS name, p.brand AS brand,
+                           p.category AS category,
+                           p.sustainability_score AS sustainability_score
+                    {source}
+                    ORDER BY best.rank, best.barcode
+                    LIMIT :limit OFFSET :offset
+                """
+                count_sql = f"{ctes} SELECT COUNT(*) {source}"
+
+            rows = (await db.execute(text(page_sql), params)).mappings().all()
+            if 0 < len(rows) < limit:
+                # Última página: el total sale sin contar
+                total = offset + len(rows)
+            else:
+                # Página llena o más allá del final: conteo aparte (sin ventana
+                # en la consulta paginada, así ORDER BY … LIMIT usa el índice)
+                total = await db.scalar(text(count_sql), params)
+
+        hits = []
+        for row in rows:
+            hit = dict(row)
+            if hit["name"] is None:
+                # Producto que solo está en prices.json
+                item = LocalPriceService.get_item(hit["barcode"]) or {}
+                hit["name"] = item.get("name")
+                hit["brand"] = item.get("brand")
+            hits.append(hit)
+        return total, hits
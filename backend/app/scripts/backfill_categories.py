@@ -0,0 +1,51 @@
+"""
+Completa ProductDB.category para productos guardados antes de que se
+categorizaran al ingresar.
+
+Uso (desde backend/):
+    python -m app.scripts.backfill_categories [--all] [--batch-size 1000]
+"""
+
+import argparse
+
+from app.database.migrations import init_db
+from app.database.models import ProductDB
+from app.repositories.product_repository import ProductRepository
+from app.services.impact_service import EnvironmentalImpactService
+from app.services.nutrients import NutrientRecord
+
+
+def backfill(recategorize_all: bool = False, batch_size: int = 1000) -> int:
+    criteria = () if recategorize_all else (ProductDB.category.is_(None),)
+    updated = 0
+
+    for batch in ProductRepository.iter_batches(batch_size, *criteria):
+        rows = [
+            {
+                "barcode": product.barcode,
+                "category": EnvironmentalImpactService.categorize(
+                    product.name, NutrientRecord.from_row(product)
+                ),
+            }
+            for product in batch
+        ]
+        ProductRepository.update_many(rows)
+        updated += len(rows)
+        print(f"{updated} productos categorizados")
+
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="recategorizar también los que ya tienen categoría")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    updated = backfill(args.all, args.batch_size)
+    print(f"Listo: {updated} productos actualizados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Pasa los productos guardados con nutrients_json (texto) a las columnas
+tipadas de nutrientes y a nutrients_blob comprimido. Las lecturas ya
+entienden ambos formatos; este script achica la BD y habilita los filtros
+por nutrientes de /products/search para esas filas.
+
+Uso (desde backend/):
+    python -m app.scripts.compact_nutrients [--batch-size 1000] [--vacuum]
+"""
+
+import argparse
+import json
+
+from sqlalchemy import text
+
+from app.database.database import engine
+from app.database.migrations import init_db
+from app.database.models import ProductDB
+from app.repositories.product_repository import ProductRepository
+from app.services.nutrients import NutrientRecord
+
+
+def compact(batch_size: int = 1000) -> int:
+    updated = 0
+
+    # Las filas convertidas dejan de cumplir el criterio, pero la paginación
+    # es por barcode, así que no se saltan filas
+    for batch in ProductRepository.iter_batches(batch_size, ProductDB.nutrients_json.isnot(None)):
+        rows = []
+        for product in batch:
+            nutriments = json.loads(product.nutrients_json)
+            rows.append({
+                "barcode": product.barcode,
+                "nutrients_json": None,
+                "nutrients_blob": NutrientRecord.compress(nutriments),
+                **NutrientRecord.from_nutriments(nutriments).columns(),
+            })
+        ProductRepository.update_many(rows)
+        updated += len(rows)
+        print(f"{updated} productos compactados")
+
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM al final para devolver el espacio liberado")
+    args = parser.parse_args()
+
+    init_db()
+    updated = compact(args.batch_size)
+    if args.vacuum:
+        # VACUUM no corre dentro de una transacción
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+    print(f"Listo: {updated} productos actualizados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Importa productos desde un dump local de OpenFoodFacts (JSONL o CSV separado
+por tabs, opcionalmente .gz) sin pasar por la API.
+
+Lee el archivo como stream, filtra por país y/o prefijo de barcode, calcula
+score, categoría, impacto y precio al ingresar y guarda en lotes con upsert.
+La memoria usada no depende del tamaño del dump. Después de cada lote se
+escribe un checkpoint con el offset leído, para poder retomar con --resume.
+
+Uso (desde backend/):
+    python -m app.scripts.import_off_dump openfoodfacts-products.jsonl.gz --country chile
+    python -m app.scripts.import_off_dump en.openfoodfacts.org.products.csv.gz \\
+        --barcode-prefix 780 --resume
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from app.database.migrations import init_db
+from app.repositories.product_repository import ProductRepository
+from app.services.price_service import LocalPriceService
+from app.services.scoring_service import ProductScoringService
+
+# Columnas del CSV que no terminan en _100g pero son nutrientes
+CSV_NUTRIENT_ALIASES = {"nova_group": "nova-group"}
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith((".csv", ".tsv")) else "jsonl"
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _from_json(line: bytes) -> Optional[dict]:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return {
+        "code": record.get("code") or record.get("_id"),
+        "product_name": record.get("product_name"),
+        "brands": record.get("brands"),
+        "countries_tags": record.get("countries_tags") or [],
+        "nutriments": record.get("nutriments") or {},
+    }
+
+
+def _from_csv(line: bytes, header: List[str]) -> Optional[dict]:
+    values = next(csv.reader([line.decode("utf-8", "replace").rstrip("\r\n")],
+                             delimiter="\t", quoting=csv.QUOTE_NONE))
+    record = dict(zip(header, values))
+
+    nutriments = {}
+    for column, value in record.items():
+        if not value:
+            continue
+        key = CSV_NUTRIENT_ALIASES.get(column)
+        if key is None and column.endswith("_100g"):
+            key = column
+        if key is not None:
+            number = _to_float(value)
+            if number is not None:
+                nutriments[key] = number
+
+    return {
+        "code": record.get("code"),
+        "product_name": record.get("product_name"),
+        "brands": record.get("brands"),
+        "countries_tags": [tag for tag in (record.get("countries_tags") or "").split(",") if tag],
+        "nutriments": nutriments,
+    }
+
+
+def iter_records(path: str, fmt: str, offset: int = 0) -> Iterator[Tuple[int, Optional[dict]]]:
+    """
+    Registros normalizados del dump junto al offset (bytes del contenido
+    descomprimido) donde termina cada uno.
+    """
+    with _open(path) as f:
+        header = None
+        if fmt == "csv":
+            first = f.readline()
+            header = first.decode("utf-8").rstrip("\r\n").split("\t")
+            offset = max(offset, len(first))
+
+        # En .gz el seek descomprime hasta el offset, pero sin parsear
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            if not line.strip():
+                continue
+            record = _from_csv(line, header) if fmt == "csv" else _from_json(line)
+            yield offset, record
+
+
+def _matches(record: dict, country: Optional[str], prefixes: List[str]) -> bool:
+    code = record.get("code")
+    if not code:
+        return False
+    if prefixes and not code.startswith(tuple(prefixes)):
+        return False
+    if country:
+        tags = record["countries_tags"]
+        if f"en:{country}" not in tags and country not in tags:
+            return False
+    return True
+
+
+def _to_product(record: dict) -> dict:
+    barcode = record["code"]
+    return ProductScoringService.enrich({
+        "barcode": barcode,
+        "name": record.get("product_name"),
+        "brand": record.get("brands"),
+        "nutriments": record["nutriments"],
+        "price": LocalPriceService.get_price_by_barcode(barcode),
+    })
+
+
+def _read_checkpoint(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"offset": 0, "rows": 0, "imported": 0}
+
+
+def _write_checkpoint(path: str, state: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def import_dump(path: str, fmt: Optional[str] = None, country: Optional[str] = None,
+                prefixes: Optional[List[str]] = None, batch_size: int = 1000,
+                checkpoint: Optional[str] = None, resume: bool = False,
+                progress_every: float = 5.0) -> dict:
+    fmt = fmt or _detect_format(path)
+    prefixes = prefixes or []
+    country = country.lower() if country else None
+    checkpoint = checkpoint or f"{path}.checkpoint"
+
+    state = _read_checkpoint(checkpoint) if resume else {"offset": 0, "rows": 0, "imported": 0}
+    start_rows = state["rows"]
+    started = last_report = time.monotonic()
+    batch = []
+
+    def flush(offset: int):
+        ProductRepository.save_many(batch)
+        state["imported"] += len(batch)
+        state["offset"] = offset
+        _write_checkpoint(checkpoint, state)
+        batch.clear()
+
+    offset = state["offset"]
+    for offset, record in iter_records(path, fmt, state["offset"]):
+        state["rows"] += 1
+        if record is not None and _matches(record, country, prefixes):
+            batch.append(_to_product(record))
+            if len(batch) >= batch_size:
+                flush(offset)
+
+        now = time.monotonic()
+        if now - last_report >= progress_every:
+            rate = (state["rows"] - start_rows) / (now - started)
+            print(f"{state['rows']} filas leídas, {state['imported'] + len(batch)} importadas "
+                  f"({rate:,.0f} filas/s)", file=sys.stderr)
+            last_report = now
+
+    flush(offset)
+    elapsed = time.monotonic() - started
+    state["rows_per_second"] = round((state["rows"] - start_rows) / elapsed, 1) if elapsed else 0.0
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="dump .jsonl/.csv, opcionalmente .gz")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="por defecto según la extensión")
+    parser.add_argument("--country", help="p.ej. chile (se compara con countries_tags en:<país>)")
+    parser.add_argument("--barcode-prefix", action="append", default=[], dest="prefixes",
+                        help="solo barcodes con este prefijo (se puede repetir)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", help="archivo de checkpoint (por defecto <path>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="retomar desde el checkpoint")
+    args = parser.parse_args()
+
+    init_db()
+    state = import_dump(
+        args.path, args.format, args.country, args.prefixes,
+        args.batch_size, args.checkpoint, args.resume,
+    )
+    print(f"Listo: {state['imported']} productos importados de {state['rows']} filas "
+          f"({state['rows_per_second']:,.0f} filas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Recalcula sustainability_score, categoría e impacto de los productos
+guardados con una versión de fórmula anterior a
+ProductScoringService.FORMULA_VERSION (las lecturas también lo hacen de
+forma perezosa; este script evita ese costo en la primera consulta).
+
+Uso (desde backend/):
+    python -m app.scripts.recompute_scores [--all] [--batch-size 1000]
+"""
+
+import argparse
+import json
+
+from sqlalchemy import or_
+
+from app.database.migrations import init_db
+from app.database.models import ProductDB
+from app.repositories.product_repository import ProductRepository
+from app.services.nutrients import NutrientRecord
+from app.services.scoring_service import ProductScoringService
+
+
+def recompute(recompute_all: bool = False, batch_size: int = 1000) -> int:
+    criteria = () if recompute_all else (
+        or_(
+            ProductDB.formula_version.is_(None),
+            ProductDB.formula_version < ProductScoringService.FORMULA_VERSION,
+        ),
+    )
+    updated = 0
+
+    for batch in ProductRepository.iter_batches(batch_size, *criteria):
+        rows = []
+        for product in batch:
+            scored = ProductScoringService.enrich({
+                "name": product.name,
+                "nutriments": NutrientRecord.from_row(product),
+            })
+            rows.append({
+                "barcode": product.barcode,
+                "sustainability_score": scored["sustainability_score"],
+                "category": scored["category"],
+                "impact_json": json.dumps(scored["impact"]),
+                "formula_version": scored["formula_version"],
+            })
+        ProductRepository.update_many(rows)
+        updated += len(rows)
+        print(f"{updated} productos recalculados")
+
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="recalcular también los que ya están al día")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    updated = recompute(args.all, args.batch_size)
+    print(f"Listo: {updated} productos actualizados")
+
+
+if __name__ == "__main__":
+    main()
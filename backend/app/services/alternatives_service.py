@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import os
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from app.repositories.product_repository import AsyncProductRepository
+from app.services.metrics import Metrics
+from app.services.price_service import LocalPriceService
+
+
+class _CategoryIndex:
+    """
+    Productos con precio y score de una categoría, en dos listas ordenadas:
+    by_price (precio ascendente, a igual precio mejor score primero) y
+    by_score (score descendente, a igual score más barato primero).
+    """
+
+    __slots__ = ("entries", "by_price", "by_score")
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[float, float]] = {}
+        self.by_price: List[Tuple[float, float, str]] = []  # (precio, -score, barcode)
+        self.by_score: List[Tuple[float, float, str]] = []  # (-score, precio, barcode)
+
+    def add(self, barcode: str, price: float, score: float):
+        if barcode in self.entries:
+            self.remove(barcode)
+        self.entries[barcode] = (price, score)
+        insort(self.by_price, (price, -score, barcode))
+        insort(self.by_score, (-score, price, barcode))
+
+    def remove(self, barcode: str):
+        price, score = self.entries.pop(barcode)
+        del self.by_price[bisect_left(self.by_price, (price, -score, barcode))]
+        del self.by_score[bisect_left(self.by_score, (-score, price, barcode))]
+
+    def rebuild(self):
+        self.by_price = sorted((price, -score, barcode) for barcode, (price, score) in self.entries.items())
+        self.by_score = sorted((-score, price, barcode) for barcode, (price, score) in self.entries.items())
+
+    def cheaper(self, price: float) -> List[Tuple[float, float, str]]:
+        """Los de precio < price, más baratos primero"""
+        return self.by_price[:bisect_left(self.by_price, (price,))]
+
+    def better_scored(self, score: float) -> List[Tuple[float, float, str]]:
+        """Los de score > score, mayor score primero"""
+        return self.by_score[:bisect_left(self.by_score, (-score,))]
+
+
+class AlternativesIndex:
+    """
+    Sustitutos de un producto dentro de su categoría, para /shopping-list/optimize.
+
+    Se arma en segundo plano al iniciar la app con los productos de la BD
+    que tienen categoría, score y precio (de prices.json o de la BD), y se
+    actualiza producto a producto cuando OpenFoodFactsService guarda uno.
+    Cada consulta acota con bisect, sobre las listas de la categoría
+    ordenadas por precio y por score, los productos más baratos o con mejor
+    score, así que sugerir alternativas para una lista de 50 items cuesta
+    milisegundos.
+
+    Dentro de una categoría el impacto por kg es el mismo (depende solo de
+    la categoría), por eso los sustitutos se eligen por precio y score.
+    """
+
+    MAX_ALTERNATIVES = int(os.getenv("ALTERNATIVES_MAX", "10"))
+
+    _categories: Dict[str, _CategoryIndex] = {}
+    # barcode -> (categoría, nombre) de lo indexado
+    _products: Dict[str, Tuple[str, Optional[str]]] = {}
+    _price_version: Optional[float] = None
+    _reload_task: Optional[asyncio.Task] = None
+    _loaded = False
+    # Guardados durante una recarga, para aplicarlos sobre el índice nuevo
+    _pending: Dict[str, tuple] = {}
+
+    @classmethod
+    async def startup(cls):
+        cls.schedule_reload()
+
+    @classmethod
+    async def shutdown(cls):
+        if cls._reload_task is not None:
+            cls._reload_task.cancel()
+            await asyncio.gather(cls._reload_task, return_exceptions=True)
+            cls._reload_task = None
+
+    @classmethod
+    def schedule_reload(cls):
+        if cls._reload_task is None or cls._reload_task.done():
+            cls._reload_task = asyncio.create_task(cls.reload())
+
+    @classmethod
+    async def reload(cls):
+        """Rearma todo desde la BD (al iniciar y cuando cambia prices.json)"""
+        version = LocalPriceService.version()
+        categories: Dict[str, _CategoryIndex] = {}
+        products: Dict[str, Tuple[str, Optional[str]]] = {}
+
+        async for batch in AsyncProductRepository.iter_scored():
+            prices = LocalPriceService.get_prices(row.barcode for row in batch)
+            for row in batch:
+                price = prices[row.barcode] if prices[row.barcode] is not None else row.price
+                if price is None:
+                    continue
+                index = categories.get(row.category)
+                if index is None:
+                    index = categories[row.category] = _CategoryIndex()
+                index.entries[row.barcode] = (price, row.sustainability_score)
+                products[row.barcode] = (row.category, row.name)
+
+        for index in categories.values():
+            index.rebuild()
+
+        cls._categories, cls._products = categories, products
+        cls._price_version = version
+        cls._loaded = True
+        pending, cls._pending = cls._pending, {}
+        for args in pending.values():
+            cls._apply(*args)
+
+    @classmethod
+    def add(cls, barcode: str, name: Optional[str], category: Optional[str],
+            score: Optional[float], price: Optional[float]):
+        """Agrega o actualiza un producto recién guardado"""
+        if cls._reload_task is not None and not cls._reload_task.done():
+            cls._pending[barcode] = (barcode, name, category, score, price)
+        if cls._loaded:
+            cls._apply(barcode, name, category, score, price)
+
+    @classmethod
+    def _apply(cls, barcode: str, name: Optional[str], category: Optional[str],
+               score: Optional[float], price: Optional[float]):
+        previous = cls._products.pop(barcode, None)
+        if previous is not None:
+            cls._categories[previous[0]].remove(barcode)
+
+        local_price = LocalPriceService.get_price_by_barcode(barcode)
+        price = local_price if local_price is not None else price
+        if category is None or score is None or price is None:
+            return
+        index = cls._categories.get(category)
+        if index is None:
+            index = cls._categories[category] = _CategoryIndex()
+        index.add(barcode, price, score)
+        cls._products[barcode] = (category, name)
+
+    @classmethod
+    def _alternative(cls, barcode: str, index: _CategoryIndex, price: Optional[float], score: float) -> dict:
+        alt_price, alt_score = index.entries[barcode]
+        return {
+            "barcode": barcode,
+            "name": cls._products[barcode][1],
+            "unit_price": alt_price,
+            "sustainability_score": alt_score,
+            "price_delta": round(alt_price - price, 2) if price is not None else None,
+            "score_delta": round(alt_score - score, 2),
+        }
+
+    @classmethod
+    def check_prices(cls):
+        """
+        Si cambió prices.json, programa la recarga (mientras tanto se responde
+        con el índice anterior). Se llama una vez por request, no por item.
+        """
+        if cls._loaded and LocalPriceService.version() != cls._price_version:
+            cls.schedule_reload()
+
+    @classmethod
+    @Metrics.timed("liquiverde_alternatives_seconds")
+    def find(cls, barcode: str, category: Optional[str], price: Optional[float],
+             score: Optional[float], objective: str, limit: int) -> List[dict]:
+        """
+        Sustitutos de un producto de la lista: productos de la categoría más
+        baratos o con mejor score (o ambas cosas), ordenados según el
+        objetivo — cheapest por precio, healthiest por score y balanced por
+        el mismo puntaje con que se ordena la lista. Sin precio conocido
+        solo se comparan por score.
+        """
+        index = cls._categories.get(category) if category is not None else None
+        if index is None or limit <= 0:
+            return []
+        score = score or 0
+        limit = min(limit, cls.MAX_ALTERNATIVES)
+        known_price = price is not None
+
+        if objective == "healthiest":
+            # by_score ya viene en el orden pedido: basta filtrar hasta completar
+            ranked = (
+                b for s, p, b in index.by_score
+                if -s > score or (known_price and p < price)
+            )
+        elif objective == "cheapest" and known_price:
+            ranked = (
+                b for p, s, b in index.by_price
+                if p < price or -s > score
+            )
+        else:
+            # Unión sin repetir: más baratos + mejores en score que no son más baratos
+            candidates = [(p, -s, b) for p, s, b in index.cheaper(price)] if known_price else []
+            candidates += [
+                (p, -s, b) for s, p, b in index.better_scored(score)
+                if not known_price or p >= price
+            ]
+            if objective == "balanced":
+                key = lambda c: c[0] * 0.5 + (100 - c[1]) * 0.5
+            else:
+                key = lambda c: (c[0], -c[1])
+            ranked = (b for _, _, b in heapq.nsmallest(limit + 1, candidates, key=key))
+
+        alternatives = []
+        for candidate in ranked:
+            if candidate == barcode:
+                continue
+            alternatives.append(cls._alternative(candidate, index, price, score))
+            if len(alternatives) == limit:
+                break
+        return alternatives
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "loaded": cls._loaded,
+            "products": len(cls._products),
+            "categories": len(cls._categories),
+        }
@@ -5,6 +5,27 @@ Calcula: CO2 (kg), agua (L), residuos (kg), energía (kWh)
 Basado en nutrientes, categoría de producto, y estándares internacionales
 """
 
+import re
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from app.services.metrics import Metrics
+
+
+def _compile_category_regex(patterns: dict) -> "re.Pattern":
+    """
+    Todas las palabras clave en una sola expresión regular. El lookahead
+    prueba cada posición del nombre (también coincidencias superpuestas) y
+    cada categoría es un grupo con nombre c<i>, en orden de prioridad.
+    """
+    groups = (
+        f"(?P<c{idx}>" + "|".join(re.escape(keyword) for keyword in keywords) + ")"
+        for idx, keywords in enumerate(patterns.values())
+    )
+    return re.compile("(?=(?:" + "|".join(groups) + "))")
+
 
 class EnvironmentalImpactService:
     """
@@ -85,44 +106,86 @@ class EnvironmentalImpactService:
         "default": 0.5
     }
 
+    # Tablas de factores como arreglos alineados por código de categoría
+    # (se construyen la primera vez que se usan, ver _factor_tables)
+    CATEGORIES = [
+        "beef", "lamb", "cheese", "pork", "farmed fish", "fish", "eggs", "chicken",
+        "nuts", "oils", "cereals", "rice", "pasta", "bread", "vegetables", "fruits",
+        "legumes", "dairy", "processed", "drinks", "default",
+    ]
+    CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+    _tables = None
+
+    @classmethod
+    def _factor_tables(cls):
+        """(co2, agua, residuos, energía) por kg, indexados por código de categoría"""
+        if cls._tables is None:
+            cls._tables = tuple(
+                np.array([table.get(category, default) for category in cls.CATEGORIES])
+                for table, default in (
+                    (cls.CO2_BY_CATEGORY, 1.5),
+                    (cls.WATER_BY_CATEGORY, 1000),
+                    (cls.WASTE_BY_CATEGORY, 0.1),
+                    (cls.ENERGY_BY_CATEGORY, 0.5),
+                )
+            )
+        return cls._tables
+
+    # Patrones de búsqueda (en orden de prioridad)
+    CATEGORY_PATTERNS = {
+        "beef": ["carne roja", "beef", "res", "vacuno"],
+        "dairy": ["leche", "yogur", "queso", "mantequilla", "crema"],
+        "chicken": ["pollo", "chicken"],
+        "pork": ["cerdo", "jamón", "mortadela"],
+        "fish": ["salmón", "atún", "pescado"],
+        "cereals": ["cereal", "avena", "trigo"],
+        "bread": ["pan", "bread"],
+        "pasta": ["pasta", "fideos"],
+        "rice": ["arroz", "rice"],
+        "vegetables": ["verdura", "vegetable", "zanahoria", "brócoli"],
+        "fruits": ["fruta", "fruta", "manzana", "naranja"],
+        "legumes": ["legume", "lenteja", "porotos"],
+        "oils": ["aceite", "oil"],
+        "nuts": ["nuez", "almendra", "nut"],
+        "drinks": ["bebida", "jugo", "soda", "té", "café"],
+        "processed": ["galleta", "cookie", "snack", "pringles"]
+    }
+
+    _CATEGORY_ORDER = list(CATEGORY_PATTERNS)
+    _CATEGORY_REGEX = _compile_category_regex(CATEGORY_PATTERNS)
+
     @staticmethod
-    def _categorize_product(name: str, nutriments: dict) -> str:
-        """Intenta categorizar el producto basado en nombre y nutrientes"""
-        name_lower = name.lower()
-
-        # Patrones de búsqueda
-        patterns = {
-            "beef": ["carne roja", "beef", "res", "vacuno"],
-            "dairy": ["leche", "yogur", "queso", "mantequilla", "crema"],
-            "chicken": ["pollo", "chicken"],
-            "pork": ["cerdo", "jamón", "mortadela"],
-            "fish": ["salmón", "atún", "pescado"],
-            "cereals": ["cereal", "avena", "trigo"],
-            "bread": ["pan", "bread"],
-            "pasta": ["pasta", "fideos"],
-            "rice": ["arroz", "rice"],
-            "vegetables": ["verdura", "vegetable", "zanahoria", "brócoli"],
-            "fruits": ["fruta", "fruta", "manzana", "naranja"],
-            "legumes": ["legume", "lenteja", "porotos"],
-            "oils": ["aceite", "oil"],
-            "nuts": ["nuez", "almendra", "nut"],
-            "drinks": ["bebida", "jugo", "soda", "té", "café"],
-            "processed": ["galleta", "cookie", "snack", "pringles"]
-        }
+    @lru_cache(maxsize=8192)
+    def _match_category(name_lower: str) -> Optional[str]:
+        """Categoría de mayor prioridad cuya palabra clave aparece en el nombre"""
+        best = None
+        for match in EnvironmentalImpactService._CATEGORY_REGEX.finditer(name_lower):
+            idx = int(match.lastgroup[1:])
+            if best is None or idx < best:
+                best = idx
+                if best == 0:
+                    break
+        return EnvironmentalImpactService._CATEGORY_ORDER[best] if best is not None else None
 
-        for category, keywords in patterns.items():
-            for keyword in keywords:
-                if keyword in name_lower:
-                    return category
+    @staticmethod
+    def categorize(name: Optional[str], nutriments: Optional[dict]) -> str:
+        """Intenta categorizar el producto basado en nombre y nutrientes"""
+        category = EnvironmentalImpactService._match_category((name or "").lower())
+        if category is not None:
+            return category
 
         # Si tiene proteína alta → probablemente animal
+        nutriments = nutriments or {}
         if "protein" in nutriments and nutriments.get("protein", 0) > 15:
             return "beef"
 
         return "default"
 
+    _categorize_product = categorize
+
     @staticmethod
-    def compute_impact(nutriments: dict, name: str = "", weight_kg: float = 1.0) -> dict:
+    def compute_impact(nutriments: dict, name: str = "", weight_kg: float = 1.0,
+                       category: Optional[str] = None) -> dict:
         """
         Calcula impacto ambiental de un producto
 
@@ -130,6 +193,8 @@ class EnvironmentalImpactService:
             nutriments: dict con datos nutricionales
             name: nombre del producto para categorización
             weight_kg: peso del producto en kg
+            category: categoría ya calculada (p.ej. ProductDB.category); si
+                falta se categoriza por nombre
 
         Returns:
             dict con:
@@ -140,7 +205,7 @@ class EnvironmentalImpactService:
             - impact_score: puntuación 0-100 (100 = máximo impacto = peor)
         """
 
-        category = EnvironmentalImpactService._categorize_product(name, nutriments)
+        category = category or EnvironmentalImpactService.categorize(name, nutriments)
 
         co2_per_kg = EnvironmentalImpactService.CO2_BY_CATEGORY.get(category, 1.5)
         water_per_kg = EnvironmentalImpactService.WATER_BY_CATEGORY.get(category, 1000)
@@ -170,7 +235,70 @@ class EnvironmentalImpactService:
             "category": category
         }
 
+    @classmethod
+    def compute_impact_arrays(cls, codes: np.ndarray, weights_kg: np.ndarray) -> dict:
+        """
+        Versión columnar de compute_impact, sin redondear
+
+        Args:
+            codes: códigos de categoría (CATEGORY_CODES) por producto
+            weights_kg: peso de cada producto en kg
+
+        Returns:
+            dict de arreglos: co2_kg, water_liters, waste_kg, energy_kwh, impact_score
+        """
+        co2_table, water_table, waste_table, energy_table = cls._factor_tables()
+
+        co2_kg = co2_table[codes] * weights_kg
+        water_liters = water_table[codes] * weights_kg
+        waste_kg = waste_table[codes] * weights_kg
+        energy_kwh = energy_table[codes] * weights_kg
+
+        # Mismas normalizaciones que compute_impact
+        impact_score = (
+            np.minimum(100, co2_kg / 30 * 100) * 0.5
+            + np.minimum(100, water_liters / 15000 * 100) * 0.3
+            + np.minimum(100, waste_kg / 0.3 * 100) * 0.2
+        )
+
+        return {
+            "co2_kg": co2_kg,
+            "water_liters": water_liters,
+            "waste_kg": waste_kg,
+            "energy_kwh": energy_kwh,
+            "impact_score": impact_score,
+        }
+
+    @classmethod
+    def category_codes(cls, items: list) -> np.ndarray:
+        return np.fromiter(
+            (
+                cls.CATEGORY_CODES[
+                    item.get("category")
+                    or cls.categorize(item.get("name"), item.get("nutriments"))
+                ]
+                for item in items
+            ),
+            dtype=np.intp,
+            count=len(items),
+        )
+
     @staticmethod
+    def estimate_weights(items: list) -> np.ndarray:
+        """
+        Estimar peso: si tiene precio ~$1000 por kg, son ~200g
+        Heurística simple: price / 5000 = kg (asumiendo ~5000 CLP/kg), mínimo 100g
+        """
+        prices = np.fromiter(
+            (item.get("unit_price", 1000) or 0 for item in items), dtype=float, count=len(items)
+        )
+        quantities = np.fromiter(
+            (item.get("quantity", 1) for item in items), dtype=float, count=len(items)
+        )
+        return np.maximum(0.1, prices / 5000) * quantities
+
+    @staticmethod
+    @Metrics.timed("liquiverde_impact_batch_seconds")
     def compute_impact_batch(items: list) -> dict:
         """
         Calcula impacto total de una lista de productos
@@ -179,40 +307,26 @@ class EnvironmentalImpactService:
             items: lista de dicts con {name, nutriments, quantity, unit_price, ...}
 
         Returns:
-            dict con totales y promedio de impacto
+            dict con totales y promedio de impacto (se redondea solo el resultado final)
         """
-        total_co2 = 0.0
-        total_water = 0.0
-        total_waste = 0.0
-        total_energy = 0.0
-        total_impact_score = 0.0
-
-        for item in items:
-            name = item.get("name", "")
-            nutriments = item.get("nutriments", {})
-            quantity = item.get("quantity", 1)
-
-            # Estimar peso: si tiene precio ~$1000 por kg, son ~200g
-            # Heurística simple: price / 5000 = kg (asumiendo ~5000 CLP/kg)
-            price = item.get("unit_price", 1000)
-            estimated_weight = max(0.1, price / 5000)  # mínimo 100g
-
-            impact = EnvironmentalImpactService.compute_impact(
-                nutriments, name, estimated_weight * quantity
-            )
-
-            total_co2 += impact["co2_kg"]
-            total_water += impact["water_liters"]
-            total_waste += impact["waste_kg"]
-            total_energy += impact["energy_kwh"]
-            total_impact_score += impact["impact_score"]
+        if not items:
+            return {
+                "total_co2_kg": 0.0,
+                "total_water_liters": 0.0,
+                "total_waste_kg": 0.0,
+                "total_energy_kwh": 0.0,
+                "average_impact_score": 0
+            }
 
-        avg_impact = total_impact_score / len(items) if items else 0
+        impact = EnvironmentalImpactService.compute_impact_arrays(
+            EnvironmentalImpactService.category_codes(items),
+            EnvironmentalImpactService.estimate_weights(items),
+        )
 
         return {
-            "total_co2_kg": round(total_co2, 3),
-            "total_water_liters": round(total_water, 1),
-            "total_waste_kg": round(total_waste, 3),
-            "total_energy_kwh": round(total_energy, 2),
-            "average_impact_score": round(avg_impact, 1)
+            "total_co2_kg": round(float(impact["co2_kg"].sum()), 3),
+            "total_water_liters": round(float(impact["water_liters"].sum()), 1),
+            "total_waste_kg": round(float(impact["waste_kg"].sum()), 3),
+            "total_energy_kwh": round(float(impact["energy_kwh"].sum()), 2),
+            "average_impact_score": round(float(impact["impact_score"].mean()), 1)
         }
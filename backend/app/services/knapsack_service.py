@@ -1,68 +1,271 @@
-from app.services.openfoodfacts_service import OpenFoodFactsService
+import os
+from collections import OrderedDict
+from app.services.product_resolver import ProductResolver
 from app.services.price_service import LocalPriceService
-from app.services.sustainability_service import SustainabilityService
 from app.services.impact_service import EnvironmentalImpactService
+from app.services.metrics import Metrics
+from app.services.knapsack_solvers import (
+    DEFAULT_EPSILON, DEFAULT_PARETO_EPSILON, DP_MAX_CELLS, PRICE_UNIT, DPTableTooLarge, SolverResult,
+    SolverTimeout, UnitPieces, choose_solver, dp_fits, dp_result, dp_table_bytes, pareto_front, run_solver,
+    solve_dp, solve_dp_sweep, solve_greedy, sweep_price_unit, sweep_results,
+)
+from app.services.solver_pool import SolverPool
 
 class MultiObjectiveKnapsack:
 
+    # DPs resueltas recientemente, por (items, snapshot de precios), acotadas
+    # en cantidad y en bytes (fila de valores + decisiones)
+    MEMO_SIZE = int(os.getenv("KNAPSACK_MEMO_SIZE", "32"))
+    MEMO_MAX_BYTES = int(os.getenv("KNAPSACK_MEMO_MAX_BYTES", str(256 * 2**20)))
+    # Tablas más grandes no se memorizan: se resuelven y reconstruyen en el worker
+    MEMO_MAX_ENTRY_BYTES = int(os.getenv("KNAPSACK_MEMO_MAX_ENTRY_BYTES", str(32 * 2**20)))
+    _memo: "OrderedDict[tuple, object]" = OrderedDict()
+    _memo_bytes = 0
+    # Un sweep desde el memo reconstruye en el event loop: solo hasta estos
+    # puntos; con más se resuelve y reconstruye en el worker
+    SWEEP_INLINE_POINTS = int(os.getenv("KNAPSACK_SWEEP_INLINE_POINTS", "20"))
+
+    @staticmethod
+    def _memoizable(pieces, budget: int, price_unit=None) -> bool:
+        return dp_table_bytes(pieces.weights, budget, price_unit) <= MultiObjectiveKnapsack.MEMO_MAX_ENTRY_BYTES
+
     @staticmethod
-    async def solve(budget, shopping_items):
+    async def _load_products(shopping_items):
         # Step 1: obtener productos + valores
         products = []
+        barcodes = [item.barcode for item in shopping_items]
+        prices = LocalPriceService.get_prices(barcodes)
+        resolved = await ProductResolver.resolve_many(barcodes)
 
         for item in shopping_items:
-            product = await OpenFoodFactsService.get_product(item.barcode)
-            price = LocalPriceService.get_price_by_barcode(item.barcode) or 0
-            score = SustainabilityService.compute_score(product.nutriments) or 0
+            product = resolved.products.get(item.barcode)
+            if product is None:
+                continue
+            if product.degraded:
+                # Sin score real (OpenFoodFacts no disponible): no entra a la
+                # mochila con valor 0, se informa en unresolved
+                resolved.errors[item.barcode] = "degraded"
+                continue
+            price = prices[item.barcode] or 0
+            score = product.sustainability_score or 0
 
             products.append({
                 "barcode": item.barcode,
                 "name": product.name,
                 "price": price,
                 "value": score,    # valor a maximizar
+                "max_quantity": item.quantity,
+                "category": product.category,
             })
 
-        n = len(products)
-        W = budget
-
-        # DP table
-        dp = [[0] * (int(W) + 1) for _ in range(n + 1)]
-        choose = [[False] * (int(W) + 1) for _ in range(n + 1)]
-
-        # Knapsack: maximize sustainability score under a price constraint
-        for i in range(1, n + 1):
-            p = products[i - 1]
-            w = int(p["price"])
-            v = p["value"]
-
-            for b in range(0, int(W) + 1):
-                if w <= b:
-                    if dp[i - 1][b - w] + v > dp[i - 1][b]:
-                        dp[i][b] = dp[i - 1][b - w] + v
-                        choose[i][b] = True
-                    else:
-                        dp[i][b] = dp[i - 1][b]
-                else:
-                    dp[i][b] = dp[i - 1][b]
+        # Knapsack acotado: hasta `quantity` unidades de cada producto
+        pieces = UnitPieces(
+            [int(p["price"]) for p in products],
+            [p["value"] for p in products],
+            [p["max_quantity"] for p in products],
+        )
+        return products, pieces, resolved
 
-        # Reconstrucción
-        res = []
-        b = int(W)
+    @staticmethod
+    async def _solve_dp_memo(products, pieces, budget: int, price_unit=None):
+        """
+        DP con memo: una DP resuelta hasta el presupuesto B sirve para
+        cualquier presupuesto ≤ B con el mismo set de items y precios.
+        Si no está en el memo se resuelve en el SolverPool.
+        """
+        price_unit = price_unit or PRICE_UNIT
+        key = (
+            tuple((p["barcode"], p["price"], p["value"], p["max_quantity"]) for p in products),
+            LocalPriceService.version(),
+            price_unit,
+        )
+        memo = MultiObjectiveKnapsack._memo
+        solution = memo.get(key)
+        if solution is not None and budget // solution.scale <= solution.capacity:
+            memo.move_to_end(key)
+            Metrics.inc("liquiverde_knapsack_memo_total", result="hit")
+            return solution
 
-        for i in range(n, 0, -1):
-            if choose[i][b]:
-                res.append(products[i - 1])
-                b -= int(products[i - 1]["price"])
+        Metrics.inc("liquiverde_knapsack_memo_total", result="miss")
+        solution = await SolverPool.run(solve_dp, pieces.weights, pieces.values, budget, price_unit)
+        MultiObjectiveKnapsack._memo_put(key, solution)
+        return solution
 
-        total_cost = sum(p["price"] for p in res)
-        best_value = sum(p["value"] for p in res)
+    @staticmethod
+    def _memo_put(key: tuple, solution):
+        cls = MultiObjectiveKnapsack
+        memo = cls._memo
+        previous = memo.pop(key, None)
+        if previous is not None:
+            cls._memo_bytes -= previous.nbytes
+        memo[key] = solution
+        cls._memo_bytes += solution.nbytes
+        while memo and (len(memo) > cls.MEMO_SIZE or cls._memo_bytes > cls.MEMO_MAX_BYTES):
+            _, evicted = memo.popitem(last=False)
+            cls._memo_bytes -= evicted.nbytes
+
+    @staticmethod
+    def _summarize(products, pieces, result):
+        units = pieces.units_by_owner(result.chosen)
+
+        res = []
+        for i in sorted(units, reverse=True):
+            p = products[i]
+            res.append({
+                "barcode": p["barcode"],
+                "name": p["name"],
+                "price": p["price"],
+                "value": p["value"],
+                "quantity": units[i],
+                "total_price": p["price"] * units[i],
+                "category": p["category"],
+            })
+
+        total_cost = sum(p["total_price"] for p in res)
+        best_value = sum(p["value"] * p["quantity"] for p in res)
 
         # Calcular impacto ambiental
-        environmental_impact = EnvironmentalImpactService.compute_impact_batch(res)
+        environmental_impact = EnvironmentalImpactService.compute_impact_batch(
+            [{**p, "unit_price": p["price"]} for p in res]
+        )
 
         return {
             "best_value": round(best_value, 2),
             "total_cost": round(total_cost, 2),
             "items": res,
-            "environmental_impact": environmental_impact
+            "environmental_impact": environmental_impact,
+            "solver": result.solver,
+            "optimality_gap": round(result.optimality_gap, 4),
+        }
+
+    @staticmethod
+    async def solve(budget, shopping_items, solver: str = "auto", epsilon: float = DEFAULT_EPSILON):
+        products, pieces, resolved = await MultiObjectiveKnapsack._load_products(shopping_items)
+        W = int(budget)
+
+        if solver == "auto":
+            solver = choose_solver(pieces.weights, W)
+        elif solver == "dp" and not dp_fits(pieces.weights, W):
+            # Pedida explícitamente: se rechaza (422) en vez de reservar una tabla enorme
+            raise DPTableTooLarge(
+                f"budget {W} with {len(pieces.weights)} pieces needs a DP table over the "
+                f"{DP_MAX_CELLS} cell limit; use solver auto, branch_and_bound or fptas"
+            )
+
+        try:
+            with Metrics.timer("liquiverde_solver_seconds", solver=solver):
+                if solver == "dp" and MultiObjectiveKnapsack._memoizable(pieces, W):
+                    solution = await MultiObjectiveKnapsack._solve_dp_memo(products, pieces, W)
+                    result = dp_result(solution, pieces.weights, W)
+                else:
+                    # Con "dp" y una tabla grande, run_solver reconstruye en el worker
+                    result = await SolverPool.run(run_solver, pieces.weights, pieces.values, W, solver, epsilon)
+        except SolverTimeout:
+            # Sin tiempo para el solver pedido: greedy con su cota de brecha
+            Metrics.inc("liquiverde_solver_timeouts_total", solver=solver)
+            result = solve_greedy(pieces.weights, pieces.values, W)
+
+        summary = MultiObjectiveKnapsack._summarize(products, pieces, result)
+        summary["unresolved"] = resolved.unresolved()
+        return summary
+
+    @staticmethod
+    async def sweep(shopping_items, budgets=None, max_budget=None, max_points: int = 100):
+        """
+        Resuelve varios presupuestos con una sola DP: la última fila ya tiene
+        el mejor valor para cada capacidad ≤ presupuesto máximo.
+
+        Args:
+            budgets: presupuestos a evaluar; si es None se devuelven los
+                quiebres de la curva valor/presupuesto hasta max_budget
+            max_points: máximo de quiebres sin budgets (repartidos a lo
+                largo del presupuesto)
+
+        Returns:
+            dict con points (un resumen como el de solve por presupuesto),
+            price_unit usada y unresolved
+        """
+        products, pieces, resolved = await MultiObjectiveKnapsack._load_products(shopping_items)
+
+        W = int(max(budgets) if budgets else max_budget)
+        # Si la tabla no cabe, se redondean los precios (solución aproximada)
+        price_unit = sweep_price_unit(pieces.weights, W)
+        try:
+            with Metrics.timer("liquiverde_solver_seconds", solver="dp_sweep"):
+                points_wanted = len(budgets) if budgets else max_points
+                if (points_wanted <= MultiObjectiveKnapsack.SWEEP_INLINE_POINTS
+                        and MultiObjectiveKnapsack._memoizable(pieces, W, price_unit)):
+                    solution = await MultiObjectiveKnapsack._solve_dp_memo(products, pieces, W, price_unit)
+                    results = sweep_results(solution, pieces.weights, budgets, max_points)
+                else:
+                    results = await SolverPool.run(
+                        solve_dp_sweep, pieces.weights, pieces.values, W, price_unit, budgets, max_points
+                    )
+        except SolverTimeout:
+            # Sin DP no hay curva completa: greedy en cada presupuesto pedido
+            Metrics.inc("liquiverde_solver_timeouts_total", solver="dp_sweep")
+            targets = [int(b) for b in budgets] if budgets else [W]
+            results = [(b, solve_greedy(pieces.weights, pieces.values, b)) for b in targets]
+
+        points = []
+        for b, result in results:
+            point = MultiObjectiveKnapsack._summarize(products, pieces, result)
+            point["budget"] = b
+            points.append(point)
+
+        return {
+            "points": points,
+            "price_unit": price_unit,
+            "unresolved": resolved.unresolved(),
+        }
+
+    @staticmethod
+    async def pareto(shopping_items, max_budget=None, epsilon: float = DEFAULT_PARETO_EPSILON,
+                     max_points: int = 100):
+        """
+        Frontera de Pareto de canastas sobre costo (mín), sustentabilidad
+        (máx) y CO2 (mín, mismo cálculo que environmental_impact), en una
+        sola resolución. El cliente elige el compromiso sin resolver de nuevo.
+
+        Returns:
+            dict con points (resúmenes como los de solve, ordenados por
+            costo), epsilon efectivo de la grilla, solver ("greedy" si no
+            alcanzó el tiempo: una sola canasta) y unresolved
+        """
+        products, pieces, resolved = await MultiObjectiveKnapsack._load_products(shopping_items)
+
+        # CO2 por unidad de cada producto; es aditivo en la cantidad
+        unit_co2 = EnvironmentalImpactService.compute_impact_arrays(
+            EnvironmentalImpactService.category_codes(products),
+            EnvironmentalImpactService.estimate_weights([{"unit_price": p["price"]} for p in products]),
+        )["co2_kg"]
+        piece_co2 = [float(unit_co2[owner]) * units for owner, units in zip(pieces.owners, pieces.units)]
+
+        budget = int(max_budget) if max_budget is not None else None
+        solver = "pareto"
+        try:
+            # Pasado el deadline cooperativo pareto_front sigue con una grilla gruesa
+            with Metrics.timer("liquiverde_solver_seconds", solver="pareto"):
+                front, epsilon = await SolverPool.run(
+                    pareto_front, pieces.weights, pieces.values, piece_co2, budget, epsilon, max_points,
+                )
+            chosen = [label.chosen for label in front]
+        except SolverTimeout:
+            # Tope duro o worker caído: una sola canasta greedy, como en solve y sweep
+            Metrics.inc("liquiverde_solver_timeouts_total", solver="pareto")
+            solver = "greedy"
+            W = budget if budget is not None else sum(pieces.weights)
+            chosen = [solve_greedy(pieces.weights, pieces.values, W).chosen]
+
+        points = []
+        for basket in chosen:
+            point = MultiObjectiveKnapsack._summarize(products, pieces, SolverResult(basket, solver))
+            del point["solver"], point["optimality_gap"]
+            points.append(point)
+
+        return {
+            "points": points,
+            "epsilon": epsilon,
+            "solver": solver,
+            "unresolved": resolved.unresolved(),
         }
@@ -0,0 +1,601 @@
+"""
+Solvers de mochila 0/1 (funciones puras, sin I/O)
+
+Trabajan con pesos enteros (precio en CLP truncado, igual que la versión
+original) y valores reales (sustainability_score).
+"""
+
+import os
+import time
+from bisect import bisect_left
+from functools import reduce
+from math import gcd
+from typing import List, Optional
+
+import numpy as np
+
+
+# Unidad de precio en CLP para el eje de capacidad (1 = exacto).
+# Con 10, los precios se redondean hacia arriba a decenas: nunca se excede el
+# presupuesto, pero la solución puede dejar de ser óptima.
+PRICE_UNIT = max(1, int(os.getenv("KNAPSACK_PRICE_UNIT", "1")))
+
+
+class SolverTimeout(Exception):
+    """El solver pasó su deadline sin una solución utilizable"""
+
+
+class DPTableTooLarge(ValueError):
+    """La tabla items × capacidad de la DP supera DP_MAX_CELLS"""
+
+
+def _past(deadline: Optional[float]) -> bool:
+    """deadline es un instante de time.monotonic(); None = sin límite"""
+    return deadline is not None and time.monotonic() > deadline
+
+
+class DPSolution:
+    """
+    Resultado de la DP: la última fila de valores (mejor valor para cada
+    capacidad) y la tabla de decisiones empaquetada en bits (1 bit por
+    item × capacidad). Permite reconstruir la solución para cualquier
+    presupuesto menor o igual al resuelto.
+    """
+
+    __slots__ = ("weights", "values", "scale", "capacity", "best", "choices", "exact")
+
+    def __init__(self, weights, values, scale, capacity, best, choices, exact=True):
+        self.weights = weights      # pesos escalados
+        self.values = values
+        self.scale = scale          # CLP por unidad de capacidad
+        self.capacity = capacity    # capacidad escalada resuelta
+        self.best = best            # np.ndarray float64, largo capacity + 1
+        self.choices = choices      # por item: bits empaquetados o None
+        self.exact = exact          # False si se redondearon precios (price_unit > 1)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria de la fila de valores y de las decisiones"""
+        return self.best.nbytes + sum(bits.nbytes for bits in self.choices if bits is not None)
+
+    def _capacity_for(self, budget: int) -> int:
+        return min(self.capacity, budget // self.scale)
+
+    def best_value(self, budget: int) -> float:
+        if budget < 0 or self.capacity < 0:
+            return 0.0
+        return float(self.best[self._capacity_for(budget)])
+
+    def breakpoints(self) -> List[int]:
+        """Presupuestos (CLP) donde el mejor valor aumenta, partiendo por 0"""
+        if self.capacity < 0:
+            return []
+        steps = np.flatnonzero(self.best[1:] > self.best[:-1]) + 1
+        return [0] + [int(c) * self.scale for c in steps]
+
+    def reconstruct(self, budget: int) -> List[int]:
+        """Índices elegidos, desde el último item al primero"""
+        if budget < 0 or self.capacity < 0:
+            return []
+        c = self._capacity_for(budget)
+        chosen = []
+        for i in range(len(self.weights) - 1, -1, -1):
+            bits = self.choices[i]
+            if bits is not None and (bits[c >> 3] >> (7 - (c & 7))) & 1:
+                chosen.append(i)
+                c -= self.weights[i]
+        return chosen
+
+
+def scale_weights(weights: List[int], budget: int, price_unit: Optional[int] = None):
+    """
+    Reduce el eje de capacidad: redondea a la unidad de precio y divide por
+    el MCD de los pesos (esto último no cambia el resultado).
+
+    Returns:
+        (pesos escalados, capacidad escalada, CLP por unidad de capacidad)
+    """
+    unit = price_unit or PRICE_UNIT
+    scaled = [-(-w // unit) for w in weights]
+    divisor = reduce(gcd, scaled, 0) or 1
+    scaled = [w // divisor for w in scaled]
+    return scaled, budget // (unit * divisor), unit * divisor
+
+
+def solve_dp(weights: List[int], values: List[float], budget: int,
+             price_unit: Optional[int] = None, deadline: Optional[float] = None) -> DPSolution:
+    """
+    DP exacta con una sola fila de valores: cada item actualiza la fila
+    completa con operaciones vectorizadas. Memoria: O(capacidad) para
+    valores y capacidad/8 bytes por item para las decisiones.
+
+    Lanza SolverTimeout si pasa el deadline (una fila a medias no sirve) y
+    DPTableTooLarge si la tabla supera DP_MAX_CELLS, antes de reservar memoria.
+    """
+    scaled, capacity, scale = scale_weights(weights, budget, price_unit)
+    exact = (price_unit or PRICE_UNIT) == 1
+    if len(scaled) * (capacity + 1) > DP_MAX_CELLS:
+        raise DPTableTooLarge(
+            f"DP table of {len(scaled)} items x {capacity + 1} capacity exceeds {DP_MAX_CELLS} cells"
+        )
+    if capacity < 0:
+        return DPSolution(scaled, values, scale, capacity, np.zeros(0), [None] * len(scaled), exact)
+
+    best = np.zeros(capacity + 1)
+    choices = []
+
+    for w, v in zip(scaled, values):
+        if w > capacity:
+            choices.append(None)
+            continue
+        if _past(deadline):
+            raise SolverTimeout()
+
+        candidate = best[:capacity + 1 - w] + v
+        take = candidate > best[w:]
+        best[w:] = np.where(take, candidate, best[w:])
+
+        row = np.zeros(capacity + 1, dtype=bool)
+        row[w:] = take
+        choices.append(np.packbits(row))
+
+    return DPSolution(scaled, values, scale, capacity, best, choices, exact)
+
+
+# Selección automática: DP exacta si la tabla items × capacidad es chica,
+# branch-and-bound exacto si hay pocos items, FPTAS en otro caso.
+DP_MAX_CELLS = int(os.getenv("KNAPSACK_DP_MAX_CELLS", "20000000"))
+BNB_MAX_ITEMS = int(os.getenv("KNAPSACK_BNB_MAX_ITEMS", "60"))
+# Nodos máximos del branch-and-bound antes de devolver la mejor solución encontrada
+BNB_MAX_NODES = int(os.getenv("KNAPSACK_BNB_MAX_NODES", "200000"))
+# Celdas máximas de la tabla del FPTAS (si no alcanza, se agranda ε)
+FPTAS_MAX_CELLS = int(os.getenv("KNAPSACK_FPTAS_MAX_CELLS", "50000000"))
+DEFAULT_EPSILON = 0.05
+
+
+class SolverResult:
+    """Índices elegidos + solver usado + cota de la brecha de optimalidad (0 = óptimo)"""
+
+    __slots__ = ("chosen", "solver", "optimality_gap")
+
+    def __init__(self, chosen: List[int], solver: str, optimality_gap: float = 0.0):
+        self.chosen = chosen
+        self.solver = solver
+        self.optimality_gap = optimality_gap
+
+
+def _useful_items(weights, values, budget) -> List[int]:
+    """Items con valor positivo que caben solos en el presupuesto"""
+    return [
+        i for i, (w, v) in enumerate(zip(weights, values))
+        if v > 0 and w <= budget
+    ]
+
+
+def _by_density(items, weights, values) -> List[int]:
+    return sorted(
+        items,
+        key=lambda i: values[i] / weights[i] if weights[i] else float("inf"),
+        reverse=True,
+    )
+
+
+def fractional_bound(weights, values, budget: int) -> float:
+    """Cota superior de la relajación fraccional (greedy por densidad valor/precio)"""
+    total = 0.0
+    capacity = budget
+    for i in _by_density(_useful_items(weights, values, budget), weights, values):
+        if weights[i] <= capacity:
+            capacity -= weights[i]
+            total += values[i]
+        else:
+            return total + values[i] * capacity / weights[i]
+    return total
+
+
+def _gap(value: float, upper_bound: float) -> float:
+    if upper_bound <= 0 or value >= upper_bound:
+        return 0.0
+    return (upper_bound - value) / upper_bound
+
+
+def _greedy_fill(chosen: List[int], candidates: List[int], weights, values, budget: int):
+    """Agrega por densidad los candidatos que todavía quepan"""
+    taken = set(chosen)
+    capacity = budget - sum(weights[i] for i in chosen)
+    for i in _by_density(candidates, weights, values):
+        if i not in taken and weights[i] <= capacity:
+            chosen.append(i)
+            taken.add(i)
+            capacity -= weights[i]
+    return chosen
+
+
+def solve_branch_and_bound(weights: List[int], values: List[float], budget: int,
+                           max_nodes: Optional[int] = None,
+                           deadline: Optional[float] = None) -> SolverResult:
+    """
+    Branch-and-bound exacto en profundidad sobre los items ordenados por
+    densidad, podando con la cota de la relajación fraccional. Si se
+    alcanza max_nodes o el deadline devuelve la mejor solución encontrada
+    y la brecha contra la mayor cota pendiente.
+    """
+    max_nodes = max_nodes or BNB_MAX_NODES
+    order = _by_density(_useful_items(weights, values, budget), weights, values)
+    w = [weights[i] for i in order]
+    v = [values[i] for i in order]
+    n = len(order)
+
+    def bound(k, capacity, value):
+        for j in range(k, n):
+            if w[j] <= capacity:
+                capacity -= w[j]
+                value += v[j]
+            else:
+                return value + v[j] * capacity / w[j]
+        return value
+
+    # Solución inicial: greedy por densidad
+    best_value, best_chosen, capacity = 0.0, None, budget
+    for j in range(n):
+        if w[j] <= capacity:
+            capacity -= w[j]
+            best_value += v[j]
+            best_chosen = (j, best_chosen)
+
+    # Nodo: (siguiente item, capacidad restante, valor acumulado, elegidos como lista enlazada)
+    stack = [(0, budget, 0.0, None)]
+    nodes = 0
+    upper_bound = best_value
+
+    while stack:
+        node = stack.pop()
+        k, capacity, value, chosen = node
+        # El reloj se consulta cada 1024 nodos
+        if nodes >= max_nodes or (nodes & 1023 == 0 and _past(deadline)):
+            stack.append(node)
+            upper_bound = max(bound(*pending[:3]) for pending in stack)
+            break
+        nodes += 1
+
+        if value > best_value:
+            best_value, best_chosen = value, chosen
+        if k == n or bound(k, capacity, value) <= best_value:
+            continue
+
+        stack.append((k + 1, capacity, value, chosen))
+        if w[k] <= capacity:
+            stack.append((k + 1, capacity - w[k], value + v[k], (k, chosen)))
+
+    chosen = []
+    while best_chosen is not None:
+        j, best_chosen = best_chosen
+        chosen.append(order[j])
+    chosen.sort(reverse=True)
+
+    return SolverResult(chosen, "branch_and_bound", _gap(best_value, max(upper_bound, best_value)))
+
+
+def solve_fptas(weights: List[int], values: List[float], budget: int,
+                epsilon: float = DEFAULT_EPSILON, deadline: Optional[float] = None) -> SolverResult:
+    """
+    Esquema (1 − ε): escala los valores a enteros con K = ε·vmax/n y resuelve
+    la DP de "peso mínimo para cada valor" con la misma fila vectorizada y
+    decisiones en bits que solve_dp. Los items sobrantes se agregan con greedy.
+    """
+    items = _useful_items(weights, values, budget)
+    if not items:
+        return SolverResult([], "fptas", 0.0)
+
+    n = len(items)
+    total = sum(values[i] for i in items)
+    scale = max(
+        epsilon * max(values[i] for i in items) / n,
+        total * n / FPTAS_MAX_CELLS,
+    )
+    profits = [int(values[i] // scale) for i in items]
+    max_profit = sum(profits)
+
+    min_weight = np.full(max_profit + 1, np.inf)
+    min_weight[0] = 0.0
+    choices = []
+
+    for i, p in zip(items, profits):
+        if p == 0:
+            choices.append(None)
+            continue
+        if _past(deadline):
+            raise SolverTimeout()
+        candidate = min_weight[:max_profit + 1 - p] + weights[i]
+        take = candidate < min_weight[p:]
+        min_weight[p:] = np.where(take, candidate, min_weight[p:])
+
+        row = np.zeros(max_profit + 1, dtype=bool)
+        row[p:] = take
+        choices.append(np.packbits(row))
+
+    p = int(np.flatnonzero(min_weight <= budget)[-1])
+    chosen = []
+    for k in range(n - 1, -1, -1):
+        bits = choices[k]
+        if bits is not None and (bits[p >> 3] >> (7 - (p & 7))) & 1:
+            chosen.append(items[k])
+            p -= profits[k]
+
+    chosen = _greedy_fill(chosen, items, weights, values, budget)
+    value = sum(values[i] for i in chosen)
+
+    # OPT ≤ valor + n·K (cada item pierde menos de K al escalar) y OPT ≤ cota fraccional
+    loss_bound = n * scale / (value + n * scale)
+    gap = min(loss_bound, _gap(value, fractional_bound(weights, values, budget)))
+    return SolverResult(chosen, "fptas", gap)
+
+
+class UnitPieces:
+    """
+    Mochila acotada reducida a 0/1 por división binaria: un producto con
+    q unidades se parte en piezas de 1, 2, 4, …, resto unidades, de modo que
+    cualquier cantidad 0..q se arma con O(log q) piezas.
+    """
+
+    __slots__ = ("weights", "values", "owners", "units")
+
+    def __init__(self, weights: List[int], values: List[float], quantities: List[int]):
+        self.weights, self.values, self.owners, self.units = [], [], [], []
+        for owner, (w, v, q) in enumerate(zip(weights, values, quantities)):
+            size = 1
+            while q > 0:
+                take = min(size, q)
+                self.weights.append(w * take)
+                self.values.append(v * take)
+                self.owners.append(owner)
+                self.units.append(take)
+                q -= take
+                size *= 2
+
+    def units_by_owner(self, chosen: List[int]) -> dict:
+        """Unidades elegidas por producto original"""
+        units = {}
+        for piece in chosen:
+            owner = self.owners[piece]
+            units[owner] = units.get(owner, 0) + self.units[piece]
+        return units
+
+
+def dp_fits(weights: List[int], budget: int, price_unit: Optional[int] = None) -> bool:
+    """True si la tabla items × capacidad de la DP cabe en DP_MAX_CELLS"""
+    _, capacity, _ = scale_weights(weights, budget, price_unit)
+    return len(weights) * (capacity + 1) <= DP_MAX_CELLS
+
+
+def dp_table_bytes(weights: List[int], budget: int, price_unit: Optional[int] = None) -> int:
+    """Cota de DPSolution.nbytes antes de resolver (fila float64 + 1 bit por item × capacidad)"""
+    _, capacity, _ = scale_weights(weights, budget, price_unit)
+    if capacity < 0:
+        return 0
+    return (capacity + 1) * 8 + len(weights) * -(-(capacity + 1) // 8)
+
+
+def choose_solver(weights: List[int], budget: int) -> str:
+    if dp_fits(weights, budget):
+        return "dp"
+    if len(weights) <= BNB_MAX_ITEMS:
+        return "branch_and_bound"
+    return "fptas"
+
+
+def solve_greedy(weights: List[int], values: List[float], budget: int) -> SolverResult:
+    """
+    Respaldo O(n log n) cuando un solver no alcanza a terminar: greedy por
+    densidad o el mejor item solo, lo que valga más (garantiza ≥ 1/2 del óptimo).
+    """
+    items = _useful_items(weights, values, budget)
+    chosen = _greedy_fill([], items, weights, values, budget)
+    value = sum(values[i] for i in chosen)
+    if items:
+        single = max(items, key=lambda i: values[i])
+        if values[single] > value:
+            chosen, value = [single], values[single]
+    return SolverResult(chosen, "greedy", _gap(value, fractional_bound(weights, values, budget)))
+
+
+def run_solver(weights: List[int], values: List[float], budget: int,
+               solver: str = "auto", epsilon: float = DEFAULT_EPSILON,
+               deadline: Optional[float] = None) -> SolverResult:
+    """Resuelve con el solver pedido ("auto" elige según items × presupuesto)"""
+    if solver == "auto":
+        solver = choose_solver(weights, budget)
+
+    if solver == "branch_and_bound":
+        return solve_branch_and_bound(weights, values, budget, deadline=deadline)
+    if solver == "fptas":
+        return solve_fptas(weights, values, budget, epsilon, deadline)
+
+    return dp_result(solve_dp(weights, values, budget, deadline=deadline), weights, budget)
+
+
+def dp_result(solution: DPSolution, weights: List[int], budget: int) -> SolverResult:
+    """SolverResult para un presupuesto a partir de una DP ya resuelta"""
+    chosen = solution.reconstruct(budget)
+    gap = 0.0
+    if not solution.exact:
+        # Con precios redondeados la DP deja de ser exacta
+        value = sum(solution.values[i] for i in chosen)
+        gap = _gap(value, fractional_bound(weights, solution.values, budget))
+    return SolverResult(chosen, "dp", gap)
+
+
+def sweep_results(solution: DPSolution, weights: List[int], budgets: Optional[List[int]] = None,
+                  max_points: Optional[int] = None):
+    """
+    (presupuesto, SolverResult) para cada presupuesto pedido o, sin budgets,
+    para los quiebres de la curva (a lo más max_points, repartidos a lo
+    largo del presupuesto).
+    """
+    if budgets:
+        targets = [int(b) for b in budgets]
+    else:
+        targets = solution.breakpoints()
+        if max_points and len(targets) > max_points:
+            targets = [targets[i] for i in sorted(_thin_along(np.asarray(targets), max_points))]
+    return [(b, dp_result(solution, weights, b)) for b in targets]
+
+
+def solve_dp_sweep(weights: List[int], values: List[float], budget: int,
+                   price_unit: Optional[int] = None, budgets: Optional[List[int]] = None,
+                   max_points: Optional[int] = None, deadline: Optional[float] = None):
+    """
+    solve_dp + sweep_results en el mismo proceso: para tablas que no se
+    memorizan, así desde el worker viajan solo las elecciones y no la tabla.
+    """
+    return sweep_results(solve_dp(weights, values, budget, price_unit, deadline), weights, budgets, max_points)
+
+
+def sweep_price_unit(weights: List[int], budget: int) -> int:
+    """Menor unidad de precio que deja la tabla de la DP bajo DP_MAX_CELLS"""
+    unit = PRICE_UNIT
+    while not dp_fits(weights, budget, unit):
+        unit *= 2
+    return unit
+
+
+# --- Frontera de Pareto (costo, sustentabilidad, CO2) ---
+
+DEFAULT_PARETO_EPSILON = 0.01
+# Si la frontera intermedia supera este tamaño se engruesa la grilla (ε × 1.25)
+PARETO_MAX_LABELS = int(os.getenv("KNAPSACK_PARETO_MAX_LABELS", "2000"))
+# Tope de etiquetas una vez pasado el deadline: termina rápido con una frontera más gruesa
+PARETO_DEADLINE_LABELS = 100
+
+
+class ParetoLabel:
+    """Una canasta de la frontera: totales y piezas elegidas"""
+
+    __slots__ = ("cost", "value", "co2", "chosen")
+
+    def __init__(self, cost: float, value: float, co2: float, chosen: List[int]):
+        self.cost = cost
+        self.value = value
+        self.co2 = co2
+        self.chosen = chosen
+
+
+def _epsilon_boxes(cost, value, co2, epsilon: float) -> np.ndarray:
+    """
+    Caja de la grilla logarítmica (1 + ε) de cada etiqueta en los tres ejes,
+    empaquetada en un int64. El CO2 se lleva a gramos para que la grilla
+    tenga resolución en canastas chicas.
+    """
+    step = np.log1p(epsilon)
+    cost_box = np.floor(np.log1p(cost) / step).astype(np.int64)
+    value_box = np.floor(np.log1p(value) / step).astype(np.int64)
+    co2_box = np.floor(np.log1p(co2 * 1000) / step).astype(np.int64)
+    return (cost_box << 40) | (value_box << 20) | co2_box
+
+
+def _pareto_prune(cost, value, co2, epsilon: float) -> np.ndarray:
+    """
+    Índices de las etiquetas que sobreviven: una por caja de la grilla ε
+    (la más barata) y luego solo las no dominadas (costo ≤, valor ≥, CO2 ≤).
+    """
+    boxes = _epsilon_boxes(cost, value, co2, epsilon)
+    order = np.lexsort((co2, -value, cost, boxes))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = boxes[order[1:]] != boxes[order[:-1]]
+    candidates = order[first]
+
+    # Barrido por costo creciente: una etiqueta está dominada si alguna más
+    # barata ya vista tiene valor ≥ y CO2 ≤. Las vistas se guardan como una
+    # escalera 2D (valor y CO2 crecientes), consultada con bisect.
+    candidates = candidates[np.lexsort((co2[candidates], -value[candidates], cost[candidates]))]
+    values, emissions = value[candidates].tolist(), co2[candidates].tolist()
+    stair_value: List[float] = []
+    stair_co2: List[float] = []
+    keep = []
+    for position, (v, c) in enumerate(zip(values, emissions)):
+        k = bisect_left(stair_value, v)
+        if k < len(stair_value) and stair_co2[k] <= c:
+            continue
+        keep.append(position)
+        # Sacar de la escalera lo que esta etiqueta domina (valor ≤ v y CO2 ≥ c)
+        low = bisect_left(stair_co2, c, 0, k)
+        high = k + 1 if k < len(stair_value) and stair_value[k] == v else k
+        stair_value[low:high] = [v]
+        stair_co2[low:high] = [c]
+    return candidates[keep]
+
+
+def _thin_along(cost: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    max_points índices repartidos a lo largo del costo (o presupuesto): el
+    más cercano a cada punto de una grilla pareja entre el mínimo y el
+    máximo (siempre incluye ambos extremos). Si varios puntos caen en el
+    mismo índice, el cupo sobrante se llena parejo por rango.
+    """
+    order = np.argsort(cost, kind="stable")
+    sorted_cost = cost[order]
+    targets = np.linspace(sorted_cost[0], sorted_cost[-1], max_points)
+    right = np.clip(np.searchsorted(sorted_cost, targets), 1, len(order) - 1)
+    nearest = np.where(targets - sorted_cost[right - 1] <= sorted_cost[right] - targets, right - 1, right)
+    picked = np.unique(nearest)
+    if len(picked) < max_points:
+        rest = np.setdiff1d(np.arange(len(order)), picked)
+        fill = rest[np.linspace(0, len(rest) - 1, max_points - len(picked)).round().astype(int)]
+        picked = np.union1d(picked, fill)
+    return order[picked]
+
+
+def pareto_front(weights: List[int], values: List[float], co2: List[float],
+                 budget: Optional[int] = None, epsilon: float = DEFAULT_PARETO_EPSILON,
+                 max_points: Optional[int] = None, max_labels: Optional[int] = None,
+                 deadline: Optional[float] = None):
+    """
+    Frontera de Pareto aproximada de canastas 0/1 minimizando costo y CO2 y
+    maximizando valor, por fusión de etiquetas pieza a pieza.
+
+    Tras cada pieza se deja una etiqueta por caja de la grilla (1 + ε) y se
+    descartan las dominadas, así el tamaño de la frontera queda acotado por la
+    grilla y no por 2^n. Cada canasta lleva sus piezas como máscara de bits.
+    Si la frontera intermedia pasa de max_labels la grilla crece de a 25%.
+    Con max_points la frontera final se reduce a esa cantidad de canastas
+    repartidas a lo largo del costo, sin engrosar la grilla. Pasado el
+    deadline se sigue con una grilla mucho más gruesa en vez de fallar.
+
+    Returns:
+        (lista de ParetoLabel ordenada por costo, ε efectivo)
+    """
+    max_labels = max_labels or PARETO_MAX_LABELS
+    cost = np.zeros(1)
+    value = np.zeros(1)
+    emissions = np.zeros(1)
+    masks = np.zeros(1, dtype=object)
+
+    for piece, (w, v, c) in enumerate(zip(weights, values, co2)):
+        fits = cost + w <= budget if budget is not None else np.ones(len(cost), dtype=bool)
+        cost = np.concatenate((cost, cost[fits] + w))
+        value = np.concatenate((value, value[fits] + v))
+        emissions = np.concatenate((emissions, emissions[fits] + c))
+        masks = np.concatenate((masks, masks[fits] | (1 << piece)))
+
+        if _past(deadline):
+            max_labels = min(max_labels, PARETO_DEADLINE_LABELS)
+        keep = _pareto_prune(cost, value, emissions, epsilon)
+        while len(keep) > max_labels:
+            epsilon *= 1.25
+            keep = _pareto_prune(cost, value, emissions, epsilon)
+        cost, value, emissions, masks = cost[keep], value[keep], emissions[keep], masks[keep]
+
+    if max_points and len(cost) > max_points:
+        keep = _thin_along(cost, max_points)
+        cost, value, emissions, masks = cost[keep], value[keep], emissions[keep], masks[keep]
+
+    front = []
+    for i in np.argsort(cost, kind="stable"):
+        mask = masks[i]
+        chosen = []
+        while mask:
+            low_bit = mask & -mask
+            chosen.append(low_bit.bit_length() - 1)
+            mask ^= low_bit
+        front.append(ParetoLabel(float(cost[i]), float(value[i]), float(emissions[i]), chosen))
+    return front, epsilon
@@ -0,0 +1,203 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# Tiempos de la request en curso por etapa (solo si se pidió el desglose)
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """
+    Contadores e histogramas de latencia en memoria (por proceso), expuestos
+    en formato de texto de Prometheus por /metrics.
+
+    Registrar una observación es un bisect + una suma bajo un lock, así que
+    se puede dejar activo bajo carga. METRICS_ENABLED=0 lo desactiva.
+    """
+
+    ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+    # Segundos; cubren desde un hit de caché hasta un timeout de OpenFoodFacts
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+               0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    HELP = {
+        "liquiverde_http_request_seconds": "Duración de las requests HTTP por ruta",
+        "liquiverde_product_lookup_seconds": "Duración de get_product según de dónde salió el producto",
+        "liquiverde_product_lookups_total": "Productos resueltos por origen (cache, db, upstream)",
+        "liquiverde_upstream_request_seconds": "Duración de las llamadas a OpenFoodFacts",
+        "liquiverde_upstream_errors_total": "Intentos fallidos contra OpenFoodFacts por motivo",
+        "liquiverde_upstream_retries_total": "Reintentos contra OpenFoodFacts",
+        "liquiverde_upstream_degraded_total": "Productos servidos solo con prices.json porque OpenFoodFacts falló",
+        "liquiverde_db_query_seconds": "Duración de las operaciones de ProductRepository",
+        "liquiverde_price_lookup_seconds": "Duración de las consultas a LocalPriceService",
+        "liquiverde_solver_seconds": "Duración de los solvers de knapsack",
+        "liquiverde_knapsack_memo_total": "Consultas al memo de DPs de knapsack (hit/miss)",
+        "liquiverde_product_refresh_total": "Refrescos en segundo plano de productos vencidos (ok/error/dropped)",
+        "liquiverde_solver_timeouts_total": "Solves que pasaron SOLVER_TIME_LIMIT y respondieron con greedy",
+        "liquiverde_solver_pool_restarts_total": "Executors del SolverPool reemplazados porque murió un worker",
+        "liquiverde_impact_batch_seconds": "Duración de compute_impact_batch",
+        "liquiverde_alternatives_seconds": "Duración de la búsqueda de sustitutos de un item en AlternativesIndex",
+    }
+
+    _histograms: Dict[Tuple[str, tuple], _Histogram] = {}
+    _counters: Dict[Tuple[str, tuple], float] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def observe(cls, name: str, seconds: float, **labels):
+        if not cls.ENABLED:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        bucket = bisect_left(cls.BUCKETS, seconds)
+        with cls._lock:
+            histogram = cls._histograms.get(key)
+            if histogram is None:
+                histogram = cls._histograms[key] = _Histogram(len(cls.BUCKETS) + 1)
+            histogram.counts[bucket] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+        timings = _request_timings.get()
+        if timings is not None:
+            # p.ej. liquiverde_db_query_seconds{op="get_many"} -> db_query_get_many
+            stage = name.removeprefix("liquiverde_").removesuffix("_seconds")
+            if labels:
+                stage += "_" + "_".join(str(value) for value in labels.values())
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @classmethod
+    def inc(cls, name: str, amount: float = 1, **labels):
+        if not cls.ENABLED:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + amount
+
+    @classmethod
+    @contextmanager
+    def timer(cls, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.observe(name, time.perf_counter() - started, **labels)
+
+    @classmethod
+    def timed(cls, name: str, **labels):
+        """Decorador que registra la duración de una función (sync o async)"""
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        cls.observe(name, time.perf_counter() - started, **labels)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    cls.observe(name, time.perf_counter() - started, **labels)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def start_request_timings() -> Dict[str, float]:
+        """Activa el desglose por etapa para la request actual (ver MetricsMiddleware)"""
+        timings: Dict[str, float] = {}
+        _request_timings.set(timings)
+        return timings
+
+    @staticmethod
+    def stop_request_timings():
+        _request_timings.set(None)
+
+    @staticmethod
+    def server_timing_header(timings: Dict[str, float]) -> str:
+        """Formato del header Server-Timing (duraciones en ms)"""
+        return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items())
+
+    @staticmethod
+    def _format_labels(labels: tuple, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        body = ",".join(
+            '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+            for key, value in pairs
+        )
+        return "{" + body + "}"
+
+    @classmethod
+    def render(cls, gauges: Optional[Dict[str, float]] = None,
+               counters: Optional[Dict[str, float]] = None) -> str:
+        """
+        Todas las métricas en formato de texto de Prometheus (version 0.0.4).
+        gauges/counters agregan valores que se llevan en otro lado (p.ej. ProductCache).
+        """
+        with cls._lock:
+            histograms = {
+                key: (list(h.counts), h.sum, h.count) for key, h in cls._histograms.items()
+            }
+            registered = dict(cls._counters)
+
+        lines = []
+        described = set()
+
+        def describe(name: str, kind: str):
+            if name not in described:
+                described.add(name)
+                if name in cls.HELP:
+                    lines.append(f"# HELP {name} {cls.HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(registered.items()):
+            describe(name, "counter")
+            lines.append(f"{name}{cls._format_labels(labels)} {value:g}")
+
+        for name, value in (counters or {}).items():
+            describe(name, "counter")
+            lines.append(f"{name} {value:g}")
+
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(cls.BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{cls._format_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+            lines.append(f"{name}_bucket{cls._format_labels(labels, ('le', '+Inf'))} {count}")
+            lines.append(f"{name}_sum{cls._format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{cls._format_labels(labels)} {count}")
+
+        for name, value in (gauges or {}).items():
+            describe(name, "gauge")
+            lines.append(f"{name} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._histograms.clear()
+            cls._counters.clear()
@@ -0,0 +1,97 @@
+import json
+import zlib
+from typing import Optional
+
+# Claves de nutriments de OpenFoodFacts que leen SustainabilityService.compute_score
+# y EnvironmentalImpactService.categorize → columna tipada de ProductDB
+TYPED_NUTRIENTS = {
+    "nova-group": "nova_group",
+    "sugars_100g": "sugars_100g",
+    "saturated-fat_100g": "saturated_fat_100g",
+    "salt_100g": "salt_100g",
+    "energy-kcal_100g": "energy_kcal_100g",
+    "protein": "protein",
+}
+
+
+def _to_number(value, integer: bool = False):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if integer else number
+
+
+class NutrientRecord:
+    """
+    Los nutrientes que usan el score y la categorización, armados desde las
+    columnas tipadas de ProductDB (sin decodificar el JSON completo).
+
+    Se comporta como el dict de nutriments para esos servicios: get(), in y
+    valor de verdad (present indica si el producto tenía nutriments, aunque
+    ninguno sea de los tipados). El dict completo queda comprimido en
+    ProductDB.nutrients_blob y solo se lee con full_nutriments().
+    """
+
+    __slots__ = tuple(TYPED_NUTRIENTS.values()) + ("present",)
+
+    def __init__(self, present: bool = False, **values):
+        self.present = present
+        for column in TYPED_NUTRIENTS.values():
+            setattr(self, column, values.get(column))
+
+    @classmethod
+    def from_nutriments(cls, nutriments: Optional[dict]) -> "NutrientRecord":
+        nutriments = nutriments or {}
+        return cls(bool(nutriments), **{
+            column: _to_number(nutriments.get(key), integer=column == "nova_group")
+            for key, column in TYPED_NUTRIENTS.items()
+        })
+
+    @classmethod
+    def from_row(cls, db_product) -> "NutrientRecord":
+        if db_product.nutrients_json is not None:
+            # Fila anterior a las columnas tipadas (ver app.scripts.compact_nutrients)
+            return cls.from_nutriments(json.loads(db_product.nutrients_json))
+        return cls(bool(db_product.has_nutriments), **{
+            column: getattr(db_product, column) for column in TYPED_NUTRIENTS.values()
+        })
+
+    def get(self, key: str, default=None):
+        column = TYPED_NUTRIENTS.get(key)
+        value = getattr(self, column) if column is not None else None
+        return default if value is None else value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __bool__(self) -> bool:
+        return self.present
+
+    def columns(self) -> dict:
+        """Valores para las columnas tipadas de ProductDB"""
+        return {column: getattr(self, column) for column in TYPED_NUTRIENTS.values()}
+
+    def to_dict(self) -> Optional[dict]:
+        """nutriments resumido (solo las claves tipadas presentes); None si no tenía"""
+        if not self.present:
+            return None
+        return {key: getattr(self, column) for key, column in TYPED_NUTRIENTS.items()
+                if getattr(self, column) is not None}
+
+    @staticmethod
+    def compress(nutriments: Optional[dict]) -> Optional[bytes]:
+        if not nutriments:
+            return None
+        return zlib.compress(json.dumps(nutriments, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def full_nutriments(db_product) -> Optional[dict]:
+        """dict completo de OpenFoodFacts (la fila debe traer nutrients_blob cargado)"""
+        if db_product.nutrients_json is not None:
+            return json.loads(db_product.nutrients_json)
+        if db_product.nutrients_blob is None:
+            return None
+        return json.loads(zlib.decompress(db_product.nutrients_blob))
@@ -1,45 +1,429 @@
-from app.repositories.product_repository import ProductRepository
-from app.services.sustainability_service import SustainabilityService
+from app.repositories.product_repository import AsyncProductRepository
+from app.services.scoring_service import ProductScoringService
 from app.services.price_service import LocalPriceService
+from app.services.product_cache import ProductCache
+from app.services.metrics import Metrics
+from app.services.product_refresher import ProductRefresher
+from app.services.impact_service import EnvironmentalImpactService
+from app.services.nutrients import NutrientRecord
+from app.services.alternatives_service import AlternativesIndex
+from app.services.upstream_guard import (
+    CircuitBreaker, CircuitOpenError, RateLimited, TokenBucket, UpstreamError,
+)
 from app.models.product import ProductModel
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import httpx
 import json
+import os
+import random
+import time
 
 class OpenFoodFactsService:
 
     BASE_URL = "https://world.openfoodfacts.org/api/v0/product/"
 
+    # Pool de conexiones compartido (keep-alive) hacia OpenFoodFacts
+    TIMEOUT = float(os.getenv("OFF_TIMEOUT", "5.0"))  # lectura, por intento
+    CONNECT_TIMEOUT = float(os.getenv("OFF_CONNECT_TIMEOUT", "2.0"))
+    POOL_TIMEOUT = float(os.getenv("OFF_POOL_TIMEOUT", "2.0"))
+    # Tope para todos los intentos de una consulta (bajo RESOLVER_ITEM_TIMEOUT)
+    TOTAL_TIMEOUT = float(os.getenv("OFF_TOTAL_TIMEOUT", "6.0"))
+    MAX_CONNECTIONS = int(os.getenv("OFF_MAX_CONNECTIONS", "20"))
+    MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OFF_MAX_KEEPALIVE", "10"))
+    KEEPALIVE_EXPIRY = float(os.getenv("OFF_KEEPALIVE_EXPIRY", "30.0"))
+
+    # Control de admisión: requests por segundo (0 = sin límite) y ráfaga.
+    # Sin cupo se espera en cola dentro de TOTAL_TIMEOUT
+    RATE_LIMIT = float(os.getenv("OFF_RATE_LIMIT", "10"))
+    RATE_BURST = float(os.getenv("OFF_RATE_BURST", "20"))
+    # Reintentos ante 429/5xx/errores de red, con backoff exponencial y jitter completo
+    RETRIES = int(os.getenv("OFF_RETRIES", "2"))
+    BACKOFF_BASE = float(os.getenv("OFF_BACKOFF_BASE", "0.2"))
+    BACKOFF_MAX = float(os.getenv("OFF_BACKOFF_MAX", "2.0"))
+    # Fallas seguidas que abren el circuito y segundos hasta volver a probar
+    BREAKER_FAILURES = int(os.getenv("OFF_BREAKER_FAILURES", "5"))
+    BREAKER_RESET = float(os.getenv("OFF_BREAKER_RESET", "30.0"))
+
+    _bucket = TokenBucket(RATE_LIMIT, RATE_BURST)
+    _breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+
+    _client: Optional[httpx.AsyncClient] = None
+    # Consultas en curso por barcode ("single-flight")
+    _inflight: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def _build_client(cls, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=cls._timeout(cls.TOTAL_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=cls.MAX_CONNECTIONS,
+                max_keepalive_connections=cls.MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=cls.KEEPALIVE_EXPIRY,
+            ),
+            transport=transport,
+        )
+
+    @classmethod
+    def _timeout(cls, remaining: float) -> httpx.Timeout:
+        """Timeouts de un intento, recortados a lo que queda del tope total"""
+        return httpx.Timeout(
+            min(cls.TIMEOUT, remaining),
+            connect=min(cls.CONNECT_TIMEOUT, remaining),
+            pool=min(cls.POOL_TIMEOUT, remaining),
+        )
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "breaker": cls._breaker.stats(),
+            "rate_limit": cls.RATE_LIMIT,
+            "inflight": len(cls._inflight),
+        }
+
+    @classmethod
+    async def startup(cls, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """Crea el cliente HTTP compartido (se llama desde el lifespan de la app)"""
+        if cls._client is not None:
+            await cls._client.aclose()
+        cls._client = cls._build_client(transport)
+
+    @classmethod
+    async def shutdown(cls):
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    @classmethod
+    def _get_client(cls) -> httpx.AsyncClient:
+        # Fuera del lifespan (scripts) se crea el cliente bajo demanda
+        if cls._client is None:
+            cls._client = cls._build_client()
+        return cls._client
+
+    @classmethod
+    async def _fetch_coalesced(cls, barcode: str):
+        """
+        Las consultas concurrentes por el mismo barcode comparten una única
+        llamada a OpenFoodFacts.
+        """
+        task = cls._inflight.get(barcode)
+        if task is None:
+            task = asyncio.ensure_future(cls._fetch_from_api(barcode))
+            cls._inflight[barcode] = task
+            task.add_done_callback(lambda t: cls._on_fetch_done(barcode, t))
+        # shield: si un llamador se cancela (timeout) no cancela a los demás
+        return await asyncio.shield(task)
+
+    @classmethod
+    def _on_fetch_done(cls, barcode: str, task: asyncio.Task):
+        if cls._inflight.get(barcode) is task:
+            del cls._inflight[barcode]
+        if not task.cancelled():
+            task.exception()  # marcar como recuperada aunque nadie espere
+
+    @staticmethod
+    def _from_db(db_product) -> Tuple[ProductModel, bool]:
+        """
+        Returns:
+            (producto, stale) — stale indica que score/impacto se recalcularon
+            porque la fila tenía una versión de fórmula anterior
+        """
+        nutrients = NutrientRecord.from_row(db_product)
+        product_dict = {
+            "barcode": db_product.barcode,
+            "name": db_product.name,
+            "brand": db_product.brand,
+            "nutriments": nutrients,
+            "sustainability_score": db_product.sustainability_score,
+            "price": db_product.price,
+            "category": db_product.category,
+        }
+
+        if ProductScoringService.is_current(db_product.formula_version):
+            product_dict["nutriments"] = nutrients.to_dict()
+            product_dict["impact"] = json.loads(db_product.impact_json) if db_product.impact_json else None
+            return ProductModel(**product_dict), False
+
+        # El recálculo lee solo los nutrientes tipados
+        ProductScoringService.enrich(product_dict)
+        product_dict.pop("formula_version")
+        product_dict["nutriments"] = nutrients.to_dict()
+        return ProductModel(**product_dict), True
+
+    @staticmethod
+    def _compact(product: Optional[ProductModel]) -> Optional[ProductModel]:
+        """Copia con nutriments resumido (lo que guarda ProductCache y responde la API por defecto)"""
+        if product is None or not product.nutriments:
+            return product
+        return product.model_copy(update={
+            "nutriments": NutrientRecord.from_nutriments(product.nutriments).to_dict()
+        })
+
+    @staticmethod
+    def _scores_row(product: ProductModel) -> dict:
+        """Columnas a actualizar tras recalcular un producto desactualizado"""
+        return {
+            "barcode": product.barcode,
+            "sustainability_score": product.sustainability_score,
+            "category": product.category,
+            "impact_json": json.dumps(product.impact),
+            "formula_version": ProductScoringService.FORMULA_VERSION,
+        }
+
+    @staticmethod
+    def _index_product(product: ProductModel):
+        """Actualiza AlternativesIndex con un producto recién guardado o recalculado"""
+        AlternativesIndex.add(
+            product.barcode, product.name, product.category, product.sustainability_score, product.price
+        )
+
     @staticmethod
-    async def get_product(barcode: str):
+    def _record_lookup(source: str, started: Optional[float] = None, count: int = 1):
+        if started is not None:
+            Metrics.observe("liquiverde_product_lookup_seconds", time.perf_counter() - started, source=source)
+        if count:
+            Metrics.inc("liquiverde_product_lookups_total", count, source=source)
+
+    @staticmethod
+    async def get_product(barcode: str, full_nutriments: bool = False):
+        """
+        Args:
+            full_nutriments: devolver el nutriments completo de OpenFoodFacts
+                (se lee el blob de la BD y no se usa la caché); por defecto
+                solo los nutrientes tipados de NutrientRecord
+        """
+        started = time.perf_counter()
+        ProductRefresher.record_request(barcode)
+
+        # 0. Caché en memoria (incluye resultados negativos)
+        cached = ProductCache.get(barcode) if not full_nutriments else ProductCache.MISS
+        if cached is not ProductCache.MISS:
+            OpenFoodFactsService._record_lookup("cache", started)
+            return cached
 
         # 1. Buscar en BD
-        db_product = ProductRepository.get(barcode)
+        db_product = await AsyncProductRepository.get(barcode, with_nutriments=full_nutriments)
         if db_product:
-            return ProductModel(
-                barcode=db_product.barcode,
-                name=db_product.name,
-                brand=db_product.brand,
-                nutriments=json.loads(db_product.nutrients_json),
-                sustainability_score=db_product.sustainability_score,
-                price=db_product.price
-            )
+            product, stale = OpenFoodFactsService._from_db(db_product)
+            if stale:
+                await AsyncProductRepository.update_many([OpenFoodFactsService._scores_row(product)])
+                OpenFoodFactsService._index_product(product)
+            # Vencida: se responde con la fila guardada y se refresca en segundo plano
+            if ProductRefresher.is_stale(db_product):
+                ProductRefresher.schedule(barcode)
+            ProductCache.put(barcode, product)
+            if full_nutriments:
+                product.nutriments = NutrientRecord.full_nutriments(db_product)
+            OpenFoodFactsService._record_lookup("db", started)
+            return product
 
         # 2. NO está → obtener desde API OpenFoodFacts
-        url = f"{OpenFoodFactsService.BASE_URL}{barcode}.json"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
+        product = await OpenFoodFactsService.fetch_product(barcode, full_nutriments)
+        # fetch_product ya contó la consulta
+        OpenFoodFactsService._record_lookup("upstream", started, count=0)
+        return product
+
+    @staticmethod
+    async def get_known_products(barcodes: List[str]) -> Tuple[Dict[str, Optional[ProductModel]], List[str]]:
+        """
+        Pasos 0 y 1 de get_product para un lote: caché en memoria y luego una
+        sola consulta a la BD para todo lo que falte.
+
+        Returns:
+            (productos conocidos por barcode — None si es un negativo en caché,
+             barcodes que hay que pedir a OpenFoodFacts)
+        """
+        known: Dict[str, Optional[ProductModel]] = {}
+        pending = []
+        for barcode in dict.fromkeys(barcodes):
+            ProductRefresher.record_request(barcode)
+            cached = ProductCache.get(barcode)
+            if cached is ProductCache.MISS:
+                pending.append(barcode)
+            else:
+                known[barcode] = cached
+        OpenFoodFactsService._record_lookup("cache", count=len(known))
+
+        if not pending:
+            return known, []
+
+        rows = await AsyncProductRepository.get_many(pending)
+        missing = []
+        refreshed = []
+        now = time.time()
+        for barcode in pending:
+            db_product = rows.get(barcode)
+            if db_product is None:
+                missing.append(barcode)
+                continue
+            product, stale = OpenFoodFactsService._from_db(db_product)
+            if stale:
+                refreshed.append(OpenFoodFactsService._scores_row(product))
+                OpenFoodFactsService._index_product(product)
+            if ProductRefresher.is_stale(db_product, now):
+                ProductRefresher.schedule(barcode)
+            ProductCache.put(barcode, product)
+            known[barcode] = product
+
+        # Las filas recalculadas se guardan de una vez, así se recalculan solo una vez
+        if refreshed:
+            await AsyncProductRepository.update_many(refreshed)
+        # En lote solo se cuentan; el tiempo queda en liquiverde_db_query_seconds
+        OpenFoodFactsService._record_lookup("db", count=len(pending) - len(missing))
+
+        return known, missing
+
+    @staticmethod
+    async def fetch_product(barcode: str, full_nutriments: bool = False):
+        """
+        Paso 2 de get_product: consulta (coalescida) a la API de OpenFoodFacts.
+        Si OpenFoodFacts falla o el circuito está abierto se responde con el
+        producto degradado de prices.json, cuando existe.
+
+        Raises:
+            RateLimited: no hubo cupo en el token bucket local dentro de
+                TOTAL_TIMEOUT (OpenFoodFacts no falló, no se degrada)
+            UpstreamError: OpenFoodFacts falló y el barcode no está en prices.json
+        """
+        OpenFoodFactsService._record_lookup("upstream")
+        try:
+            product = await OpenFoodFactsService._fetch_coalesced(barcode)
+            return product if full_nutriments else OpenFoodFactsService._compact(product)
+        except RateLimited:
+            raise
+        except UpstreamError as exc:
+            product = OpenFoodFactsService._degraded_product(barcode)
+            if product is None:
+                raise
+            Metrics.inc("liquiverde_upstream_degraded_total", reason=exc.reason)
+            return product
 
-        data = response.json()
+    @staticmethod
+    def _degraded_product(barcode: str) -> Optional[ProductModel]:
+        """
+        Producto armado solo con prices.json (nombre, marca, precio) y la
+        categoría deducida del nombre, sin nutrientes ni score. No se guarda
+        en BD ni en caché: la próxima consulta vuelve a intentar OpenFoodFacts.
+        """
+        item = LocalPriceService.get_item(barcode)
+        if item is None:
+            return None
+        name = item.get("name")
+        category = EnvironmentalImpactService.categorize(name, None)
+        return ProductModel(
+            barcode=barcode,
+            name=name,
+            brand=item.get("brand"),
+            price=LocalPriceService.get_price_by_barcode(barcode),
+            category=category,
+            impact=EnvironmentalImpactService.compute_impact(
+                {}, name or "", weight_kg=1.0, category=category
+            ),
+            degraded=True,
+        )
+
+    @staticmethod
+    async def refresh_product(barcode: str):
+        """
+        Vuelve a pedir a OpenFoodFacts un producto ya guardado y actualiza BD
+        y caché (lo llama ProductRefresher en segundo plano).
+        """
+        product = await OpenFoodFactsService._fetch_coalesced(barcode)
+        if product is None:
+            # OpenFoodFacts ya no lo tiene: se sigue sirviendo la fila guardada
+            ProductCache.invalidate(barcode)
+            await AsyncProductRepository.update_many([{"barcode": barcode, "fetched_at": time.time()}])
+        return product
+
+    @classmethod
+    async def _request_json(cls, barcode: str) -> dict:
+        """
+        GET del producto con control de admisión: token bucket (se espera
+        turno hasta agotar TOTAL_TIMEOUT), hasta RETRIES reintentos con
+        backoff y jitter dentro del mismo tope, y circuit breaker (con el
+        circuito abierto se falla sin llamar a la red).
+
+        Raises:
+            CircuitOpenError, RateLimited, UpstreamError
+        """
+        url = f"{cls.BASE_URL}{barcode}.json"
+        deadline = time.monotonic() + cls.TOTAL_TIMEOUT
+        attempt = 0
+        while True:
+            if not cls._breaker.allow():
+                raise CircuitOpenError(cls._breaker.retry_after())
+            remaining = deadline - time.monotonic()
+            try:
+                await cls._bucket.acquire(remaining)
+            except RateLimited:
+                # Límite propio, no una falla de OpenFoodFacts: libera la prueba del breaker
+                cls._breaker.release_probe()
+                Metrics.inc("liquiverde_upstream_errors_total", reason="rate_limited")
+                raise
+
+            retry_after = None
+            try:
+                with Metrics.timer("liquiverde_upstream_request_seconds"):
+                    response = await cls._get_client().get(
+                        url, timeout=cls._timeout(max(0.1, deadline - time.monotonic()))
+                    )
+                if response.status_code == 404:
+                    data = {"status": 0}
+                elif response.status_code == 429 or response.status_code >= 500:
+                    retry_after = response.headers.get("Retry-After")
+                    raise UpstreamError(f"http_{response.status_code}")
+                elif response.status_code != 200:
+                    raise UpstreamError(f"http_{response.status_code}", retryable=False)
+                else:
+                    try:
+                        data = response.json()
+                    except ValueError:
+                        raise UpstreamError("invalid_json")
+                    if not isinstance(data, dict) or (data.get("status") != 0 and "product" not in data):
+                        raise UpstreamError("invalid_json")
+            except httpx.TimeoutException:
+                error = UpstreamError("timeout")
+            except httpx.TransportError:
+                error = UpstreamError("network")
+            except UpstreamError as exc:
+                error = exc
+            else:
+                cls._breaker.record_success()
+                return data
+
+            Metrics.inc("liquiverde_upstream_errors_total", reason=error.reason)
+            if not error.retryable:
+                # Otro 4xx: OpenFoodFacts respondió, no cuenta para el circuito
+                cls._breaker.release_probe()
+                raise error
+            cls._breaker.record_failure()
+
+            # Backoff exponencial con jitter completo; un Retry-After del servidor manda
+            delay = random.uniform(0, min(cls.BACKOFF_MAX, cls.BACKOFF_BASE * 2 ** attempt))
+            if retry_after is not None:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            attempt += 1
+            if attempt > cls.RETRIES or time.monotonic() + delay >= deadline:
+                raise error
+            Metrics.inc("liquiverde_upstream_retries_total")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _fetch_from_api(barcode: str):
+        data = await OpenFoodFactsService._request_json(barcode)
 
         if data.get("status") == 0:
+            ProductCache.put(barcode, None)
             return None
 
         product_data = data["product"]
 
         nutr = product_data.get("nutriments", {})
 
-        score = SustainabilityService.compute_score(nutr)
-        
         # Intentar obtener precio: primero de prices.json, luego de Open Food Facts
         price = LocalPriceService.get_price_by_barcode(barcode)
         if price is None:
@@ -58,11 +442,20 @@ class OpenFoodFactsService:
             "name": product_data.get("product_name"),
             "brand": product_data.get("brands"),
             "nutriments": nutr,
-            "sustainability_score": score,
             "price": price
         }
+        # Score, categoría e impacto se calculan una vez al guardar
+        ProductScoringService.enrich(product_dict)
 
         # 3. Guardar en BD
-        ProductRepository.save(product_dict)
+        product_dict["fetched_at"] = time.time()
+        product_dict["ttl_seconds"] = ProductRefresher.new_ttl()
+        await AsyncProductRepository.save(product_dict)
 
-        return ProductModel(**product_dict)
\ No newline at end of file
+        for column in ("formula_version", "fetched_at", "ttl_seconds"):
+            product_dict.pop(column)
+        # Se devuelve con nutriments completo; la caché guarda el resumido
+        product = ProductModel(**product_dict)
+        ProductCache.put(barcode, OpenFoodFactsService._compact(product))
+        OpenFoodFactsService._index_product(product)
+        return product
\ No newline at end of file
@@ -1,28 +1,123 @@
 import json
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Optional
+
+from app.services.metrics import Metrics
+
+
+class _PriceCatalog:
+    """Snapshot inmutable del catálogo: lista original + índice por barcode"""
+
+    __slots__ = ("mtime", "items", "index")
+
+    def __init__(self, mtime: float, items: list):
+        self.mtime = mtime
+        self.items = items
+        self.index = {
+            item.get("barcode"): item
+            for item in items
+            if item.get("barcode")
+        }
 
 
 class LocalPriceService:
-    DATA_PATH = Path(__file__).resolve().parents[2] / "data" / "prices.json"
-    _cache = None
+    DATA_PATH = Path(os.getenv(
+        "PRICES_PATH", Path(__file__).resolve().parents[2] / "data" / "prices.json"
+    ))
+
+    # Cada cuántos segundos se revisa el mtime del archivo como máximo
+    RELOAD_CHECK_INTERVAL = float(os.getenv("PRICES_RELOAD_INTERVAL", "2.0"))
+
+    _catalog: Optional[_PriceCatalog] = None
+    _last_check = 0.0
+    _lock = threading.Lock()
 
     @classmethod
-    def _load_data(cls):
+    @Metrics.timed("liquiverde_price_lookup_seconds", op="reload")
+    def _read_catalog(cls, mtime: float) -> _PriceCatalog:
+        with open(cls.DATA_PATH, "r", encoding="utf-8") as f:
+            return _PriceCatalog(mtime, json.load(f))
+
+    @classmethod
+    def _get_catalog(cls) -> _PriceCatalog:
         """
-        print("DATA_PATH:", cls.DATA_PATH)
-        print("EXISTS?:", cls.DATA_PATH.exists())
+        Devuelve el catálogo vigente. Si el archivo cambió en disco se
+        reconstruye el índice y se reemplaza de forma atómica; si el archivo
+        nuevo no se puede leer (p.ej. escritura a medias) se sigue usando
+        el snapshot anterior.
         """
-        if cls._cache is None:
-            with open(cls.DATA_PATH, "r", encoding="utf-8") as f:
-                cls._cache = json.load(f)
-        return cls._cache
+        catalog = cls._catalog
+        now = time.monotonic()
+        if catalog is not None and now - cls._last_check < cls.RELOAD_CHECK_INTERVAL:
+            return catalog
+
+        with cls._lock:
+            catalog = cls._catalog
+            cls._last_check = now
+            try:
+                mtime = os.stat(cls.DATA_PATH).st_mtime
+            except OSError:
+                if catalog is None:
+                    raise
+                return catalog
+
+            if catalog is not None and catalog.mtime == mtime:
+                return catalog
+
+            try:
+                new_catalog = cls._read_catalog(mtime)
+            except (OSError, ValueError):
+                if catalog is None:
+                    raise
+                return catalog
+
+            cls._catalog = new_catalog
+            return new_catalog
 
     @classmethod
+    def _load_data(cls):
+        return cls._get_catalog().items
+
+    @staticmethod
+    def _to_price(item: Optional[dict]) -> Optional[float]:
+        if item is None:
+            return None
+        price = item.get("price")
+        return float(price) if price else None
+
+    @classmethod
+    @Metrics.timed("liquiverde_price_lookup_seconds", op="get_price")
     def get_price_by_barcode(cls, barcode: str) -> Optional[float]:
-        data = cls._load_data()
-        for item in data:
-            if item.get("barcode") == barcode:
-                price = item.get("price")
-                return float(price) if price else None
-        return None
+        return cls._to_price(cls._get_catalog().index.get(barcode))
+
+    @classmethod
+    @Metrics.timed("liquiverde_price_lookup_seconds", op="get_prices")
+    def get_prices(cls, barcodes: Iterable[str]) -> Dict[str, Optional[float]]:
+        """Precios para varios barcodes usando un único snapshot del catálogo"""
+        index = cls._get_catalog().index
+        return {
+            barcode: cls._to_price(index.get(barcode))
+            for barcode in barcodes
+        }
+
+    @classmethod
+    def get_item(cls, barcode: str) -> Optional[dict]:
+        return cls._get_catalog().index.get(barcode)
+
+    @classmethod
+    def all_items(cls) -> list:
+        return cls._get_catalog().items
+
+    @classmethod
+    def version(cls) -> float:
+        """Identifica el snapshot vigente (mtime del archivo), para invalidar memos"""
+        return cls._get_catalog().mtime
+
+    @classmethod
+    def reload(cls):
+        """Fuerza la revisión del archivo en la próxima consulta"""
+        cls._last_check = 0.0
+        return cls._get_catalog()
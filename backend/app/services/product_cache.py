@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.models.product import ProductModel
+
+
+class ProductCache:
+    """
+    Caché en memoria (por proceso) de ProductModel listos para usar, delante
+    de ProductRepository. LRU acotado por tamaño, con TTL y caché negativa
+    para barcodes que OpenFoodFacts no conoce.
+    """
+
+    MAX_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "5000"))
+    TTL = float(os.getenv("PRODUCT_CACHE_TTL", "600"))
+    NEGATIVE_TTL = float(os.getenv("PRODUCT_CACHE_NEGATIVE_TTL", "60"))
+
+    # Valor devuelto por get() cuando el barcode no está en caché
+    MISS = object()
+
+    _entries: "OrderedDict[str, Tuple[float, Optional[ProductModel]]]" = OrderedDict()
+    _lock = threading.Lock()
+
+    hits = 0
+    negative_hits = 0
+    misses = 0
+    evictions = 0
+
+    @classmethod
+    def get(cls, barcode: str):
+        """
+        Returns:
+            una copia del ProductModel, None si el barcode está en caché
+            negativa, o ProductCache.MISS si no hay entrada vigente
+        """
+        with cls._lock:
+            entry = cls._entries.get(barcode)
+            if entry is None:
+                cls.misses += 1
+                return cls.MISS
+
+            expires_at, product = entry
+            if expires_at <= time.monotonic():
+                del cls._entries[barcode]
+                cls.misses += 1
+                return cls.MISS
+
+            cls._entries.move_to_end(barcode)
+            if product is None:
+                cls.negative_hits += 1
+                return None
+            cls.hits += 1
+
+        # Copia superficial: los endpoints completan precio/impacto sobre el modelo
+        return product.model_copy()
+
+    @classmethod
+    def put(cls, barcode: str, product: Optional[ProductModel]):
+        """Guarda un producto (o None como resultado negativo)"""
+        if cls.MAX_SIZE <= 0:
+            return
+        ttl = cls.TTL if product is not None else cls.NEGATIVE_TTL
+        value = product.model_copy() if product is not None else None
+
+        with cls._lock:
+            cls._entries[barcode] = (time.monotonic() + ttl, value)
+            cls._entries.move_to_end(barcode)
+            while len(cls._entries) > cls.MAX_SIZE:
+                cls._entries.popitem(last=False)
+                cls.evictions += 1
+
+    @classmethod
+    def invalidate(cls, barcode: str):
+        with cls._lock:
+            cls._entries.pop(barcode, None)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls.hits = cls.negative_hits = cls.misses = cls.evictions = 0
+
+    @classmethod
+    def stats(cls) -> dict:
+        lookups = cls.hits + cls.negative_hits + cls.misses
+        return {
+            "size": len(cls._entries),
+            "max_size": cls.MAX_SIZE,
+            "hits": cls.hits,
+            "negative_hits": cls.negative_hits,
+            "misses": cls.misses,
+            "evictions": cls.evictions,
+            "hit_ratio": round((cls.hits + cls.negative_hits) / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Optional, Set
+
+from app.repositories.product_repository import AsyncProductRepository
+from app.services.metrics import Metrics
+
+
+class ProductRefresher:
+    """
+    Stale-while-revalidate para los productos guardados en la BD.
+
+    Las lecturas nunca esperan a OpenFoodFacts si ya hay una fila: si está
+    vencida (fetched_at + ttl) se devuelve igual y se encola su refresco.
+    Un worker en segundo plano vacía la cola a REFRESH_RATE por segundo como
+    máximo, y un scheduler refresca antes de que venzan los barcodes más
+    pedidos. Todo se levanta en el lifespan; sin startup() no se refresca.
+    """
+
+    TTL = int(os.getenv("PRODUCT_TTL_SECONDS", str(7 * 24 * 3600)))
+    # ± fracción aleatoria del TTL, para que no venzan todos a la vez
+    TTL_JITTER = float(os.getenv("PRODUCT_TTL_JITTER", "0.1"))
+    REFRESH_RATE = float(os.getenv("PRODUCT_REFRESH_RATE", "2.0"))
+    QUEUE_SIZE = int(os.getenv("PRODUCT_REFRESH_QUEUE", "1000"))
+    # Scheduler: cada cuánto revisa, cuántos barcodes y desde qué fracción del TTL los refresca
+    PREFRESH_INTERVAL = float(os.getenv("PRODUCT_PREFRESH_INTERVAL", "300"))
+    PREFRESH_TOP = int(os.getenv("PRODUCT_PREFRESH_TOP", "50"))
+    PREFRESH_AHEAD = float(os.getenv("PRODUCT_PREFRESH_AHEAD", "0.8"))
+    # Máximo de barcodes distintos en el contador de requests
+    COUNTER_SIZE = int(os.getenv("PRODUCT_REQUEST_COUNTER_SIZE", "10000"))
+
+    _refresh: Optional[Callable[[str], Awaitable[object]]] = None
+    _queue: Optional[asyncio.Queue] = None
+    _queued: Set[str] = set()
+    _tasks: list = []
+    _requests: Counter = Counter()
+
+    @classmethod
+    def new_ttl(cls) -> int:
+        """TTL para una fila recién obtenida"""
+        return int(cls.TTL * random.uniform(1 - cls.TTL_JITTER, 1 + cls.TTL_JITTER))
+
+    @classmethod
+    def age_ratio(cls, db_product, now: Optional[float] = None) -> float:
+        """Edad de la fila como fracción de su TTL (≥ 1 = vencida; sin fetched_at = vencida)"""
+        if db_product.fetched_at is None:
+            return float("inf")
+        ttl = db_product.ttl_seconds or cls.TTL
+        return ((now or time.time()) - db_product.fetched_at) / ttl
+
+    @classmethod
+    def is_stale(cls, db_product, now: Optional[float] = None) -> bool:
+        return cls.age_ratio(db_product, now) >= 1
+
+    @classmethod
+    def record_request(cls, barcode: str):
+        cls._requests[barcode] += 1
+        if len(cls._requests) > 2 * cls.COUNTER_SIZE:
+            cls._requests = Counter(dict(cls._requests.most_common(cls.COUNTER_SIZE)))
+
+    @classmethod
+    def schedule(cls, barcode: str) -> bool:
+        """Encola el refresco de un barcode (sin duplicados); False si no se encoló"""
+        if cls._queue is None or barcode in cls._queued:
+            return False
+        try:
+            cls._queue.put_nowait(barcode)
+        except asyncio.QueueFull:
+            Metrics.inc("liquiverde_product_refresh_total", result="dropped")
+            return False
+        cls._queued.add(barcode)
+        return True
+
+    @classmethod
+    async def startup(cls, refresh: Callable[[str], Awaitable[object]]):
+        """
+        Args:
+            refresh: corrutina que vuelve a pedir un barcode a OpenFoodFacts
+                y lo guarda (OpenFoodFactsService.refresh_product)
+        """
+        if cls._queue is not None:
+            return
+        cls._refresh = refresh
+        cls._queue = asyncio.Queue(maxsize=cls.QUEUE_SIZE)
+        cls._tasks = [
+            asyncio.create_task(cls._worker()),
+            asyncio.create_task(cls._scheduler()),
+        ]
+
+    @classmethod
+    async def shutdown(cls):
+        for task in cls._tasks:
+            task.cancel()
+        await asyncio.gather(*cls._tasks, return_exceptions=True)
+        cls._tasks = []
+        cls._queue = None
+        cls._queued.clear()
+
+    @classmethod
+    async def _worker(cls):
+        interval = 1 / cls.REFRESH_RATE if cls.REFRESH_RATE > 0 else 0
+        next_slot = time.monotonic()
+        while True:
+            barcode = await cls._queue.get()
+            try:
+                # Ritmo acotado: a lo más REFRESH_RATE refrescos por segundo
+                next_slot = max(next_slot + interval, time.monotonic())
+                await asyncio.sleep(next_slot - time.monotonic())
+                await cls._refresh(barcode)
+                Metrics.inc("liquiverde_product_refresh_total", result="ok")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Se reintenta la próxima vez que se lea la fila vencida
+                Metrics.inc("liquiverde_product_refresh_total", result="error")
+            finally:
+                cls._queued.discard(barcode)
+
+    @classmethod
+    async def _scheduler(cls):
+        while True:
+            await asyncio.sleep(cls.PREFRESH_INTERVAL)
+            try:
+                await cls.prefresh_top()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                Metrics.inc("liquiverde_product_refresh_total", result="error")
+
+    @classmethod
+    async def prefresh_top(cls) -> int:
+        """
+        Encola los barcodes más pedidos cuya fila ya pasó PREFRESH_AHEAD de
+        su TTL, y envejece el contador (mitad de cada cuenta) para que pesen
+        más los pedidos recientes.
+        """
+        top = [barcode for barcode, _ in cls._requests.most_common(cls.PREFRESH_TOP)]
+
+        decayed = Counter({b: c // 2 for b, c in cls._requests.most_common(cls.COUNTER_SIZE) if c > 1})
+        cls._requests = decayed
+
+        rows = await AsyncProductRepository.get_many(top)
+        now = time.time()
+        scheduled = 0
+        for barcode in top:
+            row = rows.get(barcode)
+            if row is not None and cls.age_ratio(row, now) >= cls.PREFRESH_AHEAD:
+                scheduled += cls.schedule(barcode)
+        return scheduled
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "running": cls._queue is not None,
+            "queued": cls._queue.qsize() if cls._queue is not None else 0,
+            "tracked_barcodes": len(cls._requests),
+        }
@@ -0,0 +1,101 @@
+import asyncio
+import os
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.models.product import ProductModel
+from app.services.openfoodfacts_service import OpenFoodFactsService
+
+
+class ResolvedProducts:
+    """Resultado de una resolución en lote: productos encontrados + fallos por barcode"""
+
+    def __init__(self):
+        self.products: Dict[str, ProductModel] = {}
+        self.errors: Dict[str, str] = {}
+
+    def unresolved(self) -> List[dict]:
+        return [
+            {"barcode": barcode, "reason": reason}
+            for barcode, reason in self.errors.items()
+        ]
+
+
+class ProductResolver:
+    """
+    Resuelve varios barcodes en paralelo contra OpenFoodFactsService.
+    La latencia total queda acotada por la consulta más lenta y no por la suma.
+    """
+
+    MAX_CONCURRENCY = int(os.getenv("RESOLVER_CONCURRENCY", "10"))
+    ITEM_TIMEOUT = float(os.getenv("RESOLVER_ITEM_TIMEOUT", "8.0"))
+
+    @staticmethod
+    async def _fetch_one(barcode: str, semaphore: asyncio.Semaphore, timeout: float):
+        async with semaphore:
+            try:
+                product = await asyncio.wait_for(
+                    OpenFoodFactsService.fetch_product(barcode), timeout
+                )
+            except asyncio.TimeoutError:
+                return barcode, None, "timeout"
+            except Exception as exc:
+                return barcode, None, f"upstream_error: {type(exc).__name__}"
+
+        if product is None:
+            return barcode, None, "not_found"
+        return barcode, product, None
+
+    @staticmethod
+    async def iter_resolved(
+        barcodes: Iterable[str],
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[str, Optional[ProductModel], Optional[str]]]:
+        """
+        Entrega (barcode, producto, error) a medida que cada barcode se
+        resuelve: primero todo lo que está en caché/BD (una consulta) y luego
+        las consultas a OpenFoodFacts en orden de llegada.
+        """
+        # Caché y BD se resuelven en lote (una consulta); solo lo que falta va a la API
+        known, missing = await OpenFoodFactsService.get_known_products(list(barcodes))
+        for barcode, product in known.items():
+            yield barcode, product, None if product is not None else "not_found"
+
+        semaphore = asyncio.Semaphore(concurrency or ProductResolver.MAX_CONCURRENCY)
+        timeout = timeout or ProductResolver.ITEM_TIMEOUT
+
+        tasks = [
+            asyncio.ensure_future(ProductResolver._fetch_one(barcode, semaphore, timeout))
+            for barcode in missing
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Si el consumidor deja de iterar (p.ej. el cliente cortó el stream)
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def resolve_many(
+        barcodes: Iterable[str],
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> ResolvedProducts:
+        """
+        Args:
+            barcodes: barcodes a resolver (los duplicados se consultan una vez)
+            concurrency: máximo de consultas simultáneas
+            timeout: segundos máximos por producto
+
+        Returns:
+            ResolvedProducts con los productos encontrados y los errores
+            ("not_found", "timeout", "upstream_error: ...") por barcode
+        """
+        resolved = ResolvedProducts()
+        async for barcode, product, error in ProductResolver.iter_resolved(barcodes, concurrency, timeout):
+            if error is None:
+                resolved.products[barcode] = product
+            else:
+                resolved.errors[barcode] = error
+        return resolved
@@ -0,0 +1,38 @@
+from typing import Optional
+
+from app.services.impact_service import EnvironmentalImpactService
+from app.services.sustainability_service import SustainabilityService
+
+
+class ProductScoringService:
+    """
+    Valores derivados de un producto que se calculan al guardarlo
+    (sustainability_score, category e impacto por kg) y se sirven desde la BD.
+    """
+
+    # Subir al cambiar SustainabilityService.compute_score,
+    # EnvironmentalImpactService.compute_impact o la categorización: las filas
+    # con una versión anterior se recalculan al leerlas o con
+    # `python -m app.scripts.recompute_scores`.
+    FORMULA_VERSION = 1
+
+    @staticmethod
+    def is_current(formula_version: Optional[int]) -> bool:
+        return formula_version == ProductScoringService.FORMULA_VERSION
+
+    @staticmethod
+    def enrich(product_dict: dict) -> dict:
+        """
+        Completa score, categoría, impacto (por 1 kg) y versión de fórmula
+        a partir de name y nutriments.
+        """
+        nutriments = product_dict.get("nutriments")
+        category = EnvironmentalImpactService.categorize(product_dict.get("name"), nutriments)
+
+        product_dict["sustainability_score"] = SustainabilityService.compute_score(nutriments)
+        product_dict["category"] = category
+        product_dict["impact"] = EnvironmentalImpactService.compute_impact(
+            nutriments or {}, product_dict.get("name") or "", weight_kg=1.0, category=category
+        )
+        product_dict["formula_version"] = ProductScoringService.FORMULA_VERSION
+        return product_dict
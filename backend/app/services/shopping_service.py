@@ -1,41 +1,48 @@
-from typing import List, Dict
-from app.services.openfoodfacts_service import OpenFoodFactsService
+from typing import AsyncIterator, Dict, List
+from app.services.product_resolver import ProductResolver
 from app.services.price_service import LocalPriceService
-from app.services.sustainability_service import SustainabilityService
 from app.services.impact_service import EnvironmentalImpactService
+from app.services.alternatives_service import AlternativesIndex
 
 
 class ShoppingOptimizer:
 
     @staticmethod
-    async def optimize(shopping_items, objective: str):
-        results = []
-
-        for item in shopping_items:
-            barcode = item.barcode
-            quantity = item.quantity
+    def _build_item(item, product, price, objective: str = "cheapest", alternatives: int = 0) -> dict:
+        # Sustitutos (con el precio original: None = sin precio conocido)
+        substitutes = AlternativesIndex.find(
+            item.barcode, product.category, price, product.sustainability_score, objective, alternatives
+        ) if alternatives else None
 
-            # Obtener datos del producto
-            product = await OpenFoodFactsService.get_product(barcode)
+        # Precio
+        price = price or 0
 
-            # Precio
-            price = LocalPriceService.get_price_by_barcode(barcode) or 0
+        # Sustentabilidad
+        score = product.sustainability_score or 0
 
-            # Sustentabilidad
-            score = SustainabilityService.compute_score(product.nutriments) or 0
-
-            results.append({
-                "barcode": barcode,
-                "name": product.name,
-                "quantity": quantity,
-                "unit_price": price,
-                "total_price": price * quantity,
-                "sustainability_score": score
-            })
+        record = {
+            "barcode": item.barcode,
+            "name": product.name,
+            "quantity": item.quantity,
+            "unit_price": price,
+            "total_price": price * item.quantity,
+            "sustainability_score": score,
+            "category": product.category,
+            # Sin datos de OpenFoodFacts: el score 0 no es real (ver summarize)
+            "degraded": product.degraded,
+        }
+        if substitutes is not None:
+            record["alternatives"] = substitutes
+        return record
 
+    @staticmethod
+    def summarize(results: List[Dict], objective: str, unresolved: List[Dict]) -> dict:
+        """Totales, orden según el objetivo e impacto ambiental de los items ya armados"""
         # Calcular totales
         total_price = sum(p["total_price"] for p in results)
-        avg_sust = sum(p["sustainability_score"] for p in results) / len(results)
+        # Los degradados no tienen score: no cuentan para el promedio
+        scored = [p["sustainability_score"] for p in results if not p.get("degraded")]
+        avg_sust = sum(scored) / len(scored) if scored else 0
 
         # OPTIMIZACIÓN por objetivo (simple MVP)
         if objective == "cheapest":
@@ -61,5 +68,63 @@ class ShoppingOptimizer:
             "average_sustainability": round(avg_sust, 2),
             "objective": objective,
             "items": results,
-            "environmental_impact": environmental_impact
+            "environmental_impact": environmental_impact,
+            "unresolved": unresolved
         }
+
+    @staticmethod
+    async def optimize(shopping_items, objective: str, alternatives: int = 0):
+        barcodes = [item.barcode for item in shopping_items]
+        prices = LocalPriceService.get_prices(barcodes)
+        if alternatives:
+            AlternativesIndex.check_prices()
+
+        # Obtener datos de todos los productos en paralelo
+        resolved = await ProductResolver.resolve_many(barcodes)
+
+        results = []
+        for item in shopping_items:
+            product = resolved.products.get(item.barcode)
+            if product is None:
+                continue
+            results.append(ShoppingOptimizer._build_item(
+                item, product, prices[item.barcode], objective, alternatives
+            ))
+
+        return ShoppingOptimizer.summarize(results, objective, resolved.unresolved())
+
+    @staticmethod
+    async def optimize_stream(shopping_items, objective: str, alternatives: int = 0) -> AsyncIterator[dict]:
+        """
+        Igual que optimize, pero entrega cada item apenas su producto se
+        resuelve ({"type": "item", "item": ...} o {"type": "unresolved",
+        "barcode", "reason"}) y al final un frame {"type": "summary", ...}
+        con el mismo contenido que devuelve optimize.
+        """
+        barcodes = [item.barcode for item in shopping_items]
+        prices = LocalPriceService.get_prices(barcodes)
+        if alternatives:
+            AlternativesIndex.check_prices()
+
+        # Un barcode puede venir en varias líneas de la lista
+        positions: Dict[str, List[int]] = {}
+        for position, item in enumerate(shopping_items):
+            positions.setdefault(item.barcode, []).append(position)
+
+        built: Dict[int, dict] = {}
+        unresolved = []
+        async for barcode, product, error in ProductResolver.iter_resolved(barcodes):
+            if error is not None:
+                unresolved.append({"barcode": barcode, "reason": error})
+                yield {"type": "unresolved", "barcode": barcode, "reason": error}
+                continue
+            for position in positions[barcode]:
+                record = ShoppingOptimizer._build_item(
+                    shopping_items[position], product, prices[barcode], objective, alternatives
+                )
+                built[position] = record
+                yield {"type": "item", "item": record}
+
+        # Mismo orden de entrada que optimize antes de ordenar por objetivo
+        results = [built[position] for position in sorted(built)]
+        yield {"type": "summary", **ShoppingOptimizer.summarize(results, objective, unresolved)}
@@ -0,0 +1,173 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from app.services.knapsack_solvers import SolverTimeout
+from app.services.metrics import Metrics
+
+
+class SolverPoolBusy(Exception):
+    """La cola de solves está llena; la API responde 503 con Retry-After"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"solver queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _call_with_deadline(func: Callable, time_limit: Optional[float], args: tuple, kwargs: dict):
+    """
+    Corre en el proceso worker: el deadline se fija al empezar el solve, así
+    la espera en cola no consume el tiempo de CPU del request.
+    """
+    deadline = time.monotonic() + time_limit if time_limit else None
+    return func(*args, deadline=deadline, **kwargs)
+
+
+class SolverPool:
+    """
+    Pool de procesos para los solvers (CPU intensivos), creado en el lifespan.
+    Así un solve grande no bloquea el event loop ni a /health o las
+    consultas de productos en caché.
+
+    Cada solve recibe un deadline cooperativo (SOLVER_TIME_LIMIT segundos de
+    ejecución); si no alcanza, el solver lanza SolverTimeout y el llamador
+    usa una respuesta aproximada. Sin startup() (scripts, benchmarks de
+    solvers) los solves corren en el mismo proceso.
+
+    Si un worker muere (OOM, kill) el executor queda roto: se reemplaza por
+    uno nuevo y el solve se reintenta una vez; si vuelve a fallar se lanza
+    SolverTimeout para que el llamador responda con greedy.
+    """
+
+    WORKERS = int(os.getenv("SOLVER_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+    # Solves en curso + en espera antes de responder 503
+    MAX_QUEUE = int(os.getenv("SOLVER_MAX_QUEUE", "16"))
+    TIME_LIMIT = float(os.getenv("SOLVER_TIME_LIMIT", "5.0"))
+    # Margen sobre TIME_LIMIT antes de dejar de esperar a un worker que no respondió
+    HARD_TIMEOUT_GRACE = float(os.getenv("SOLVER_HARD_TIMEOUT_GRACE", "2.0"))
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _workers = 1
+    _in_flight = 0
+    # Promedio móvil de la duración de los solves, para estimar Retry-After
+    _avg_seconds = 0.5
+
+    @classmethod
+    async def startup(cls, workers: Optional[int] = None):
+        if cls._executor is not None:
+            return
+        cls._workers = workers or cls.WORKERS
+        cls._executor = cls._create_executor()
+        # Levantar los workers ahora y no en el primer request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(cls._executor, math.sqrt, 1.0)
+            for _ in range(cls._workers)
+        ))
+
+    @classmethod
+    def _create_executor(cls) -> ProcessPoolExecutor:
+        # spawn: el proceso padre tiene hilos (event loop, aiosqlite) y fork no es seguro
+        return ProcessPoolExecutor(
+            max_workers=cls._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    @classmethod
+    def _replace_broken(cls, executor: ProcessPoolExecutor):
+        """Reemplaza un executor roto (solo una vez, aunque varios solves lo detecten)"""
+        if cls._executor is not executor:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+        cls._executor = cls._create_executor()
+        Metrics.inc("liquiverde_solver_pool_restarts_total")
+
+    @classmethod
+    async def shutdown(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+            cls._in_flight = 0
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "workers": cls._workers if cls._executor is not None else 0,
+            "in_flight": cls._in_flight,
+            "max_queue": cls.MAX_QUEUE,
+            "avg_seconds": round(cls._avg_seconds, 3),
+        }
+
+    @classmethod
+    def retry_after(cls) -> int:
+        return max(1, math.ceil(cls._avg_seconds * cls._in_flight / cls._workers))
+
+    @classmethod
+    def _on_done(cls, started: float):
+        cls._in_flight = max(0, cls._in_flight - 1)
+        cls._avg_seconds = 0.8 * cls._avg_seconds + 0.2 * (time.monotonic() - started)
+
+    @classmethod
+    def _release(cls, loop: asyncio.AbstractEventLoop, started: float):
+        """Callback del future (hilo del executor): libera el cupo en el event loop"""
+        try:
+            loop.call_soon_threadsafe(cls._on_done, started)
+        except RuntimeError:
+            # Loop ya cerrado (shutdown del lifespan con solves en curso): no queda cupo que liberar
+            pass
+
+    @classmethod
+    async def run(cls, func: Callable, *args, time_limit: Optional[float] = None, **kwargs):
+        """
+        Ejecuta func(*args, deadline=..., **kwargs) en el pool.
+
+        Raises:
+            SolverPoolBusy: si ya hay MAX_QUEUE solves en curso o en espera
+            SolverTimeout: si el solver no terminó dentro del límite o el
+                pool se rompió dos veces seguidas
+        """
+        time_limit = time_limit if time_limit is not None else cls.TIME_LIMIT
+
+        if cls._executor is None:
+            return _call_with_deadline(func, time_limit, args, kwargs)
+
+        if cls._in_flight >= cls.MAX_QUEUE:
+            raise SolverPoolBusy(cls.retry_after())
+
+        for _ in range(2):
+            executor = cls._executor
+            try:
+                future = executor.submit(_call_with_deadline, func, time_limit, args, kwargs)
+            except BrokenProcessPool:
+                # submit falla sin crear el future: no se ocupó cupo
+                cls._replace_broken(executor)
+                continue
+
+            cls._in_flight += 1
+            started = time.monotonic()
+            loop = asyncio.get_running_loop()
+            # El cupo se libera cuando el worker termina de verdad (no cuando el
+            # request deja de esperar), y en el hilo del event loop
+            future.add_done_callback(lambda _, started=started: cls._release(loop, started))
+
+            # El deadline corre desde que el worker toma el solve; el tope duro
+            # también cubre las rondas de espera en cola
+            rounds = math.ceil(cls._in_flight / cls._workers)
+            hard_limit = time_limit * rounds + cls.HARD_TIMEOUT_GRACE if time_limit else None
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), hard_limit)
+            except asyncio.TimeoutError:
+                # Aún no empezó: se cancela; si está corriendo, terminará por su deadline
+                future.cancel()
+                raise SolverTimeout()
+            except BrokenProcessPool:
+                # Un worker murió mientras el solve estaba en el executor
+                cls._replace_broken(executor)
+
+        # Dos executors rotos seguidos (p.ej. el mismo solve agota la memoria)
+        raise SolverTimeout()
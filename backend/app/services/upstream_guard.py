@@ -0,0 +1,134 @@
+"""
+Control de admisión hacia servicios externos (OpenFoodFacts): token bucket
+para no exceder su límite de requests y circuit breaker para fallar rápido
+mientras el servicio está caído, en vez de acumular requests esperando timeouts.
+"""
+
+import asyncio
+import time
+
+
+class UpstreamError(Exception):
+    """El servicio externo falló (status de error, respuesta no JSON, red, timeout)"""
+
+    def __init__(self, reason: str, retryable: bool = True):
+        super().__init__(reason)
+        self.reason = reason
+        self.retryable = retryable
+
+
+class RateLimited(UpstreamError):
+    """
+    El token bucket local no tiene cupo antes del tope de la consulta; no
+    cuenta como falla del servicio ni habilita la respuesta degradada.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__("rate_limited", retryable=False)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, retry_after: float):
+        super().__init__("circuit_open", retryable=False)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    rate tokens por segundo con ráfagas de hasta burst. Un llamador sin
+    token reserva el siguiente y espera su turno en la cola; si la espera
+    supera max_wait no se reserva y se lanza RateLimited con esa espera.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, max_wait: float):
+        if self.rate <= 0:
+            return
+        self._refill()
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        if wait > max_wait:
+            raise RateLimited(wait)
+        # Reserva (los tokens pueden quedar negativos: la cola de espera)
+        self.tokens -= 1
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    closed → open tras failure_threshold fallas seguidas; open rechaza todo
+    durante reset_timeout; luego half_open deja pasar una sola prueba: si
+    funciona vuelve a closed, si falla vuelve a open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        # Inicio de la prueba en half_open (0 = ninguna en curso)
+        self.probe_started = 0.0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_started = 0.0
+        # Una prueba a la vez; si la prueba se perdió (cancelada) se permite otra
+        if self.probe_started and now - self.probe_started < self.reset_timeout:
+            return False
+        self.probe_started = now
+        return True
+
+    def release_probe(self):
+        """La prueba en curso terminó sin resultado sobre el servicio (p.ej. rate limit local)"""
+        self.probe_started = 0.0
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_started = 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_started = 0.0
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opens += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """Segundos hasta la próxima prueba (0 si está cerrado)"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "retry_after": round(self.retry_after(), 1),
+        }
@@ -0,0 +1,103 @@
+"""
+Reemplazo local de OpenFoodFacts para los benchmarks: un catálogo sintético
+reproducible (semilla) y un httpx.MockTransport con latencia y tasa de error
+configurables, que se inyecta con OpenFoodFactsService.startup(transport).
+"""
+
+import asyncio
+import json
+import random
+from typing import Dict, List, Optional
+
+import httpx
+
+# Nombres con palabras clave de las distintas categorías de EnvironmentalImpactService
+PRODUCT_NAMES = [
+    "Leche Entera", "Yogur Frutilla", "Queso Gauda", "Mantequilla", "Pollo Trozado",
+    "Carne Vacuno Molida", "Jamón Cerdo", "Atún en Agua", "Salmón Ahumado",
+    "Cereal Avena", "Pan Molde", "Fideos Spaghetti", "Arroz Grado 1", "Zanahoria",
+    "Manzana Roja", "Lenteja", "Porotos Negros", "Aceite Maravilla", "Almendra",
+    "Bebida Cola", "Jugo Naranja", "Café Molido", "Galleta Chocolate", "Snack Papas",
+]
+BRANDS = ["Colun", "Soprole", "Nestlé", "Tucapel", "Carozzi", "Lider", "Watts", "Ideal"]
+
+
+class SyntheticCatalog:
+    """N productos con nutrientes y precios pseudoaleatorios (mismo seed, mismo catálogo)"""
+
+    def __init__(self, size: int, seed: int = 42, prefix: str = "990", missing_price_rate: float = 0.05):
+        rng = random.Random(seed)
+        self.products: Dict[str, dict] = {}
+        self.prices: List[dict] = []
+
+        for i in range(size):
+            barcode = f"{prefix}{i:010d}"
+            name = f"{rng.choice(PRODUCT_NAMES)} {rng.choice([250, 500, 750, 1000])}g"
+            brand = rng.choice(BRANDS)
+            self.products[barcode] = {
+                "product_name": name,
+                "brands": brand,
+                "nutriments": {
+                    "nova-group": rng.randint(1, 4),
+                    "sugars_100g": round(rng.uniform(0, 40), 1),
+                    "saturated-fat_100g": round(rng.uniform(0, 15), 1),
+                    "salt_100g": round(rng.uniform(0, 3), 2),
+                    "energy-kcal_100g": rng.randint(20, 600),
+                    "proteins_100g": round(rng.uniform(0, 30), 1),
+                },
+            }
+            if rng.random() >= missing_price_rate:
+                self.prices.append({
+                    "barcode": barcode,
+                    "name": name,
+                    "brand": brand,
+                    "price": rng.randrange(390, 12990, 10),
+                })
+
+    @property
+    def barcodes(self) -> List[str]:
+        return list(self.products)
+
+    def write_prices(self, path: str):
+        """Escribe el catálogo en el formato de data/prices.json"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.prices, f, ensure_ascii=False)
+
+
+class MockOpenFoodFacts:
+    """
+    Responde como /api/v0/product/{barcode}.json. Los barcodes que no están
+    en el catálogo devuelven status 0; con probabilidad error_rate se responde
+    un 503 en texto plano, como cuando OpenFoodFacts está sobrecargado.
+    """
+
+    def __init__(self, catalog: SyntheticCatalog, latency: float = 0.08, jitter: float = 0.04,
+                 error_rate: float = 0.0, seed: int = 42):
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        delay = self.latency + self.rng.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(0.0, delay))
+
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            return httpx.Response(503, text="Service Unavailable")
+
+        barcode = request.url.path.rsplit("/", 1)[-1].removesuffix(".json")
+        product = self.catalog.products.get(barcode)
+        if product is None:
+            return httpx.Response(200, json={"status": 0, "status_verbose": "product not found"})
+        return httpx.Response(200, json={"status": 1, "code": barcode, "product": product})
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {"calls": self.calls, "errors": self.errors}
@@ -0,0 +1,282 @@
+"""
+Benchmarks reproducibles de la API sin salir a internet.
+
+Levanta la app en proceso (httpx.ASGITransport) sobre una BD SQLite y un
+prices.json temporales, con OpenFoodFacts reemplazado por MockOpenFoodFacts,
+y mide throughput y latencias p50/p95/p99 de:
+
+    products_cold     GET /products/{barcode}, producto nunca visto (API mock)
+    products_db       GET /products/{barcode}, desde la BD (caché vacía)
+    products_cached   GET /products/{barcode}, desde ProductCache
+    shopping_optimize POST /shopping-list/optimize
+    knapsack_solve    POST /knapsack/solve
+
+además de curvas de escalamiento de los solvers (items × presupuesto). El
+resultado se escribe como JSON; con --baseline se compara contra una corrida
+anterior y se termina con código 1 si alguna métrica empeora más de --tolerance.
+
+Uso (desde backend/):
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --products 5000 --latency-ms 120 --error-rate 0.02 \\
+        --baseline bench.json --output bench-new.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.mock_upstream import MockOpenFoodFacts, SyntheticCatalog
+
+
+def _latency_summary(samples: List[float]) -> Dict[str, float]:
+    ms = np.asarray(samples, dtype=float) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "mean": round(float(ms.mean()), 3) if len(ms) else 0.0,
+        "max": round(float(ms.max()), 3) if len(ms) else 0.0,
+    }
+
+
+async def _run_scenario(client, make_request: Callable, count: int, concurrency: int) -> dict:
+    """Ejecuta count requests (make_request(i) -> (método, url, json)) con concurrencia acotada"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        method, url, body = make_request(i)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+        if failed:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": count,
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(count / wall, 1) if wall else 0.0,
+        "latency_ms": _latency_summary(latencies),
+    }
+
+
+async def run_http(args, catalog: SyntheticCatalog, upstream: MockOpenFoodFacts) -> dict:
+    # Se importa aquí: la app lee DATABASE_URL / PRICES_PATH al importarse
+    import httpx
+    from app.main import app
+    from app.services.openfoodfacts_service import OpenFoodFactsService
+    from app.services.product_cache import ProductCache
+
+    rng = random.Random(args.seed)
+    barcodes = catalog.barcodes
+    cold = rng.sample(barcodes, min(args.requests, len(barcodes)))
+    # ~2% de barcodes desconocidos en las listas (status 0 en la API)
+    pool = barcodes + [f"000{i:010d}" for i in range(max(1, len(barcodes) // 50))]
+
+    def shopping_list():
+        return [
+            {"barcode": rng.choice(pool), "quantity": rng.randint(1, 3)}
+            for _ in range(args.list_size)
+        ]
+
+    lists = [shopping_list() for _ in range(args.requests)]
+    objectives = ["cheapest", "healthiest", "balanced"]
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        await OpenFoodFactsService.startup(upstream.transport())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            get_cold = lambda i: ("GET", f"/products/{cold[i % len(cold)]}", None)
+            results["products_cold"] = await _run_scenario(client, get_cold, len(cold), args.concurrency)
+
+            ProductCache.clear()
+            results["products_db"] = await _run_scenario(client, get_cold, len(cold), args.concurrency)
+            results["products_cached"] = await _run_scenario(client, get_cold, len(cold), args.concurrency)
+
+            results["shopping_optimize"] = await _run_scenario(
+                client,
+                lambda i: ("POST", "/shopping-list/optimize",
+                           {"items": lists[i], "objective": objectives[i % 3]}),
+                args.requests, args.concurrency,
+            )
+            results["knapsack_solve"] = await _run_scenario(
+                client,
+                lambda i: ("POST", "/knapsack/solve",
+                           {"budget": args.budget, "items": lists[i]}),
+                args.requests, args.concurrency,
+            )
+
+        results["upstream"] = upstream.stats()
+        results["product_cache"] = ProductCache.stats()
+    return results
+
+
+def run_solvers(args) -> List[dict]:
+    from app.services.knapsack_solvers import BNB_MAX_ITEMS, DP_MAX_CELLS, run_solver, scale_weights
+
+    rng = random.Random(args.seed)
+    points = []
+    for n in args.solver_items:
+        weights = [rng.randrange(390, 12990, 10) for _ in range(n)]
+        values = [round(rng.uniform(0, 100), 2) for _ in range(n)]
+
+        for budget in args.solver_budgets:
+            _, capacity, _ = scale_weights(weights, budget)
+            for solver in ("dp", "branch_and_bound", "fptas"):
+                # Mismos límites que choose_solver, para no medir casos que "auto" nunca elegiría
+                if solver == "dp" and n * (capacity + 1) > DP_MAX_CELLS:
+                    continue
+                if solver == "branch_and_bound" and n > BNB_MAX_ITEMS:
+                    continue
+
+                timings = []
+                for _ in range(args.solver_repeats):
+                    started = time.perf_counter()
+                    result = run_solver(weights, values, budget, solver)
+                    timings.append(time.perf_counter() - started)
+
+                points.append({
+                    "solver": solver,
+                    "items": n,
+                    "budget": budget,
+                    "ms": round(float(np.median(timings)) * 1000, 3),
+                    "value": round(sum(values[i] for i in result.chosen), 2),
+                    "optimality_gap": round(result.optimality_gap, 4),
+                })
+    return points
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Métricas que empeoraron más de tolerance (0.2 = 20%) respecto a baseline"""
+    regressions = []
+    for name, scenario in current["http"].items():
+        before = baseline.get("http", {}).get(name)
+        if not before or "latency_ms" not in scenario:
+            continue
+        for metric in ("p50", "p95", "p99"):
+            old, new = before["latency_ms"][metric], scenario["latency_ms"][metric]
+            if old and new > old * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {old:.1f} ms -> {new:.1f} ms")
+
+    old_solvers = {(p["solver"], p["items"], p["budget"]): p for p in baseline.get("solvers", [])}
+    for point in current["solvers"]:
+        before = old_solvers.get((point["solver"], point["items"], point["budget"]))
+        if before and before["ms"] and point["ms"] > before["ms"] * (1 + tolerance):
+            regressions.append(
+                f"{point['solver']} n={point['items']} W={point['budget']}: "
+                f"{before['ms']:.1f} ms -> {point['ms']:.1f} ms"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=2000, help="tamaño del catálogo sintético")
+    parser.add_argument("--requests", type=int, default=300, help="requests por escenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--list-size", type=int, default=20, help="items por lista de compras")
+    parser.add_argument("--budget", type=int, default=30000, help="presupuesto de /knapsack/solve")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="latencia media del mock")
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de respuestas 503 del mock")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--off-rate-limit", type=float, nargs="?", default=0.0, const=None,
+                        help="activa el token bucket hacia OpenFoodFacts: sin valor usa el "
+                             "OFF_RATE_LIMIT de la app, con valor ese límite (por defecto 0 = sin límite)")
+    parser.add_argument("--solver-items", type=int, nargs="+", default=[10, 50, 200, 1000])
+    parser.add_argument("--solver-budgets", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--solver-repeats", type=int, default=3)
+    parser.add_argument("--skip-http", action="store_true", help="solo curvas de los solvers")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="liquiverde-bench-")
+    catalog = SyntheticCatalog(args.products, args.seed)
+    prices_path = os.path.join(workdir, "prices.json")
+    catalog.write_prices(prices_path)
+
+    # Antes de importar app: BD y precios aislados de los reales
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["PRICES_PATH"] = prices_path
+    # Por defecto sin token bucket (se mide la app, no la espera por cupo);
+    # --off-rate-limit lo activa con el límite de la app o el indicado
+    if args.off_rate_limit is not None:
+        os.environ["OFF_RATE_LIMIT"] = str(args.off_rate_limit)
+
+    upstream = MockOpenFoodFacts(
+        catalog, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, args.seed,
+    )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "http": {} if args.skip_http else asyncio.run(run_http(args, catalog, upstream)),
+        "solvers": run_solvers(args),
+    }
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for name, scenario in report["http"].items():
+        if "latency_ms" in scenario:
+            lat = scenario["latency_ms"]
+            print(f"{name:18} {scenario['throughput_rps']:8.1f} req/s  p50 {lat['p50']:8.1f}  "
+                  f"p95 {lat['p95']:8.1f}  p99 {lat['p99']:8.1f} ms  errores {scenario['errors']}")
+    print(f"Resultados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESIÓN {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
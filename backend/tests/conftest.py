@@ -0,0 +1,26 @@
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Los tests importan el paquete app igual que uvicorn (desde backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# BD y prices.json propios de la corrida (se leen al importar app)
+_workdir = tempfile.mkdtemp(prefix="liquiverde-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_workdir}/test.db")
+if "PRICES_PATH" not in os.environ:
+    os.environ["PRICES_PATH"] = os.path.join(_workdir, "prices.json")
+    with open(os.environ["PRICES_PATH"], "w", encoding="utf-8") as f:
+        json.dump([
+            {"barcode": "7801000000001", "name": "Arroz grado 1", "brand": "Test", "price": 1290},
+            {"barcode": "7801000000002", "name": "Aceite maravilla", "brand": "Test", "price": 2490},
+        ], f)
+
+
+@pytest.fixture(scope="session")
+def database():
+    from app.database.migrations import init_db
+    init_db()
@@ -0,0 +1,105 @@
+"""import_off_dump: filtros, formatos y reanudación desde el checkpoint"""
+
+import gzip
+import json
+
+import pytest
+
+from app.repositories.product_repository import ProductRepository
+from app.scripts import import_off_dump
+from app.scripts.import_off_dump import import_dump, iter_records
+
+PREFIX = "7805"
+
+
+def record(i: int, country: str = "en:chile") -> dict:
+    return {
+        "code": f"{PREFIX}{i:09d}",
+        "product_name": f"Importado {i}",
+        "brands": "Dump",
+        "countries_tags": [country],
+        "nutriments": {"sugars_100g": i % 20, "nova-group": 1 + i % 4},
+    }
+
+
+@pytest.fixture
+def dump(tmp_path):
+    """jsonl.gz con 25 productos de Chile, 5 de Perú, una línea inválida y una vacía"""
+    records = [record(i) for i in range(25)] + [record(100 + i, "en:peru") for i in range(5)]
+    lines = [json.dumps(r) for r in records]
+    lines[10:10] = ["{no es json", ""]
+    path = tmp_path / "dump.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return str(path)
+
+
+def imported(codes) -> dict:
+    return ProductRepository.get_many(codes)
+
+
+def test_import_filters_by_country(database, dump):
+    state = import_dump(dump, country="Chile", batch_size=7)
+
+    assert state["imported"] == 25
+    assert state["rows"] == 31  # las líneas vacías no cuentan
+    rows = imported([record(i)["code"] for i in range(25)] + [record(100)["code"]])
+    assert len(rows) == 25
+    row = rows[record(3)["code"]]
+    assert row.name == "Importado 3" and row.sugars_100g == 3 and row.sustainability_score is not None
+
+
+def test_resume_after_a_crash_imports_every_row_once(database, dump, monkeypatch):
+    checkpoint = f"{dump}.checkpoint"
+    save_many = ProductRepository.save_many
+    saved = []
+
+    def crash_on_third_batch(products):
+        if len(saved) == 2:
+            raise RuntimeError("corte de luz")
+        saved.append([p["barcode"] for p in products])
+        save_many(products)
+
+    monkeypatch.setattr(import_off_dump.ProductRepository, "save_many", crash_on_third_batch)
+    with pytest.raises(RuntimeError):
+        import_dump(dump, batch_size=6)
+
+    with open(checkpoint, encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["imported"] == 12
+    done = [code for batch in saved for code in batch]
+
+    monkeypatch.setattr(import_off_dump.ProductRepository, "save_many", lambda products: (
+        saved.append([p["barcode"] for p in products]), save_many(products)))
+    state = import_dump(dump, batch_size=6, resume=True)
+
+    resumed = [code for batch in saved[2:] for code in batch]
+    assert not set(done) & set(resumed)
+    assert sorted(done + resumed) == sorted(r["code"] for r in map(record, [*range(25), *range(100, 105)]))
+    assert state["imported"] == 30
+    assert state["rows"] == 31
+
+
+def test_resume_without_checkpoint_starts_over(database, dump):
+    state = import_dump(dump, checkpoint=f"{dump}.missing", resume=True, prefixes=[f"{PREFIX}00000001"])
+
+    assert state["rows"] == 31
+    assert state["imported"] == 10  # códigos 10..19
+
+
+def test_csv_dump_resumes_from_offset(tmp_path):
+    header = ["code", "product_name", "brands", "countries_tags", "nova_group", "sugars_100g", "energy-kcal_100g"]
+    rows = [
+        [f"{PREFIX}99000000{i}", f"Galleta {i}", "Dump", "en:chile,en:peru", "4", "30.5", ""]
+        for i in range(3)
+    ]
+    path = tmp_path / "dump.csv"
+    path.write_text("\n".join("\t".join(r) for r in [header] + rows) + "\n", encoding="utf-8")
+
+    records = list(iter_records(str(path), "csv"))
+    assert [r["code"] for _, r in records] == [r[0] for r in rows]
+    assert records[0][1]["nutriments"] == {"nova-group": 4.0, "sugars_100g": 30.5}
+    assert records[0][1]["countries_tags"] == ["en:chile", "en:peru"]
+
+    after_first = records[0][0]
+    assert [r["code"] for _, r in iter_records(str(path), "csv", after_first)] == [r[0] for r in rows[1:]]
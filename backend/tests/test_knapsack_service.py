@@ -0,0 +1,83 @@
+"""
+MultiObjectiveKnapsack con productos fijos (sin resolver barcodes) y el
+SolverPool reemplazado donde hace falta forzar un timeout.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.knapsack_service import MultiObjectiveKnapsack
+from app.services.knapsack_solvers import SolverTimeout, UnitPieces
+from app.services.metrics import Metrics
+from app.services.product_resolver import ResolvedProducts
+from app.services.solver_pool import SolverPool
+
+
+PRODUCTS = [
+    {"barcode": f"780000000000{i}", "name": f"Producto {i}", "price": price, "value": value,
+     "max_quantity": quantity, "category": "default"}
+    for i, (price, value, quantity) in enumerate([
+        (1200, 70.0, 2), (800, 40.0, 1), (2500, 90.0, 1), (600, 20.0, 3), (1500, 65.0, 1),
+    ])
+]
+
+
+@pytest.fixture
+def fixed_products(monkeypatch):
+    async def load_products(shopping_items):
+        pieces = UnitPieces(
+            [p["price"] for p in PRODUCTS], [p["value"] for p in PRODUCTS], [p["max_quantity"] for p in PRODUCTS]
+        )
+        return PRODUCTS, pieces, ResolvedProducts()
+
+    monkeypatch.setattr(MultiObjectiveKnapsack, "_load_products", staticmethod(load_products))
+
+
+@pytest.fixture
+def solver_timeout(monkeypatch):
+    async def run(func, *args, **kwargs):
+        raise SolverTimeout()
+
+    monkeypatch.setattr(SolverPool, "run", run)
+
+
+def timeouts(solver: str) -> float:
+    return Metrics._counters.get(("liquiverde_solver_timeouts_total", (("solver", solver),)), 0)
+
+
+def test_pareto_returns_sorted_front(fixed_products):
+    result = asyncio.run(MultiObjectiveKnapsack.pareto([], max_budget=5000, epsilon=0.01))
+
+    assert result["solver"] == "pareto"
+    costs = [point["total_cost"] for point in result["points"]]
+    assert costs == sorted(costs)
+    assert all(cost <= 5000 for cost in costs)
+    assert len(result["points"]) > 1
+
+
+def test_pareto_falls_back_to_greedy_on_timeout(fixed_products, solver_timeout):
+    before = timeouts("pareto")
+
+    result = asyncio.run(MultiObjectiveKnapsack.pareto([], max_budget=5000, epsilon=0.01))
+
+    assert result["solver"] == "greedy"
+    assert len(result["points"]) == 1
+    assert 0 < result["points"][0]["total_cost"] <= 5000
+    assert timeouts("pareto") == before + 1
+
+
+def test_pareto_fallback_without_budget_takes_everything(fixed_products, solver_timeout):
+    result = asyncio.run(MultiObjectiveKnapsack.pareto([]))
+
+    total = sum(p["price"] * p["max_quantity"] for p in PRODUCTS)
+    assert result["points"][0]["total_cost"] == total
+
+
+def test_solve_and_sweep_fall_back_to_greedy_on_timeout(fixed_products, solver_timeout):
+    solved = asyncio.run(MultiObjectiveKnapsack.solve(5000, [], solver="branch_and_bound"))
+    swept = asyncio.run(MultiObjectiveKnapsack.sweep([], budgets=[2000, 5000]))
+
+    assert solved["solver"] == "greedy"
+    assert solved["total_cost"] <= 5000
+    assert [point["solver"] for point in swept["points"]] == ["greedy", "greedy"]
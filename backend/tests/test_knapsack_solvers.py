@@ -0,0 +1,285 @@
+"""
+Solvers de knapsack_solvers contra fuerza bruta en instancias chicas
+(todas las canastas posibles), con semillas fijas.
+"""
+
+import random
+from itertools import product
+
+import pytest
+
+from app.services.knapsack_solvers import (
+    DPTableTooLarge, UnitPieces, pareto_front, run_solver, solve_branch_and_bound, solve_dp,
+    solve_dp_sweep, solve_fptas, solve_greedy, sweep_results,
+)
+
+
+def random_instance(seed: int, n: int = 10):
+    rng = random.Random(seed)
+    weights = [rng.randint(1, 60) * 10 for _ in range(n)]
+    values = [round(rng.uniform(0, 100), 2) for _ in range(n)]
+    budget = rng.randint(0, sum(weights))
+    return weights, values, budget
+
+
+def brute_force(weights, values, budget) -> float:
+    """Mejor valor entre todas las canastas 0/1 que caben en el presupuesto"""
+    best = 0.0
+    for take in product((0, 1), repeat=len(weights)):
+        if sum(w for w, t in zip(weights, take) if t) <= budget:
+            best = max(best, sum(v for v, t in zip(values, take) if t))
+    return best
+
+
+def check_feasible(chosen, weights, budget):
+    assert len(set(chosen)) == len(chosen)
+    assert sum(weights[i] for i in chosen) <= budget
+
+
+def value_of(chosen, values) -> float:
+    return sum(values[i] for i in chosen)
+
+
+SEEDS = range(25)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_dp_is_optimal(seed):
+    weights, values, budget = random_instance(seed)
+    result = run_solver(weights, values, budget, solver="dp")
+
+    check_feasible(result.chosen, weights, budget)
+    assert value_of(result.chosen, values) == pytest.approx(brute_force(weights, values, budget))
+    assert result.optimality_gap == 0.0
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_dp_solution_serves_smaller_budgets(seed):
+    weights, values, budget = random_instance(seed)
+    solution = solve_dp(weights, values, budget)
+
+    for smaller in (0, budget // 3, budget // 2, budget):
+        chosen = solution.reconstruct(smaller)
+        check_feasible(chosen, weights, smaller)
+        optimum = brute_force(weights, values, smaller)
+        assert value_of(chosen, values) == pytest.approx(optimum)
+        assert solution.best_value(smaller) == pytest.approx(optimum)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_dp_breakpoints_are_where_value_increases(seed):
+    weights, values, budget = random_instance(seed, n=8)
+    solution = solve_dp(weights, values, budget)
+
+    points = solution.breakpoints()
+    assert points[0] == 0
+    for before, after in zip(points, points[1:]):
+        assert solution.best_value(after) > solution.best_value(before)
+        assert solution.best_value(after - 1) == solution.best_value(before)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_dp_with_rounded_prices_stays_within_budget(seed):
+    weights, values, budget = random_instance(seed)
+    weights = [w + 7 for w in weights]
+    solution = solve_dp(weights, values, budget, price_unit=100)
+
+    chosen = solution.reconstruct(budget)
+    check_feasible(chosen, weights, budget)
+    assert not solution.exact
+    assert value_of(chosen, values) <= brute_force(weights, values, budget) + 1e-9
+
+
+def test_dp_rejects_tables_over_the_cell_limit():
+    with pytest.raises(DPTableTooLarge):
+        solve_dp([1, 3], [1.0, 2.0], 10 ** 12)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_branch_and_bound_is_optimal(seed):
+    weights, values, budget = random_instance(seed, n=12)
+    result = solve_branch_and_bound(weights, values, budget)
+
+    check_feasible(result.chosen, weights, budget)
+    assert value_of(result.chosen, values) == pytest.approx(brute_force(weights, values, budget))
+    assert result.optimality_gap == 0.0
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_branch_and_bound_reports_gap_when_cut_short(seed):
+    weights, values, budget = random_instance(seed, n=12)
+    result = solve_branch_and_bound(weights, values, budget, max_nodes=5)
+
+    check_feasible(result.chosen, weights, budget)
+    optimum = brute_force(weights, values, budget)
+    assert value_of(result.chosen, values) >= (1 - result.optimality_gap) * optimum - 1e-9
+
+
+@pytest.mark.parametrize("epsilon", [0.5, 0.2, 0.05])
+@pytest.mark.parametrize("seed", SEEDS)
+def test_fptas_is_within_epsilon(seed, epsilon):
+    weights, values, budget = random_instance(seed)
+    result = solve_fptas(weights, values, budget, epsilon)
+
+    check_feasible(result.chosen, weights, budget)
+    optimum = brute_force(weights, values, budget)
+    value = value_of(result.chosen, values)
+    assert value >= (1 - epsilon) * optimum - 1e-9
+    assert value >= (1 - result.optimality_gap) * optimum - 1e-9
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_greedy_is_half_approximation(seed):
+    weights, values, budget = random_instance(seed)
+    result = solve_greedy(weights, values, budget)
+
+    check_feasible(result.chosen, weights, budget)
+    optimum = brute_force(weights, values, budget)
+    value = value_of(result.chosen, values)
+    assert value >= optimum / 2 - 1e-9
+    assert value >= (1 - result.optimality_gap) * optimum - 1e-9
+
+
+@pytest.mark.parametrize("quantities", [[1], [2, 3], [5, 7, 1], [8, 0, 13]])
+def test_unit_pieces_build_every_quantity(quantities):
+    pieces = UnitPieces([100] * len(quantities), [1.0] * len(quantities), quantities)
+
+    for owner, quantity in enumerate(quantities):
+        own = [i for i, o in enumerate(pieces.owners) if o == owner]
+        assert sum(pieces.units[i] for i in own) == quantity
+        reachable = {0}
+        for i in own:
+            reachable |= {r + pieces.units[i] for r in reachable}
+        assert reachable == set(range(quantity + 1))
+
+    units = pieces.units_by_owner(list(range(len(pieces.weights))))
+    assert units == {o: q for o, q in enumerate(quantities) if q}
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_bounded_knapsack_through_unit_pieces(seed):
+    rng = random.Random(seed)
+    n = 4
+    prices = [rng.randint(1, 40) * 10 for _ in range(n)]
+    scores = [round(rng.uniform(1, 100), 2) for _ in range(n)]
+    quantities = [rng.randint(0, 4) for _ in range(n)]
+    budget = rng.randint(0, sum(p * q for p, q in zip(prices, quantities)))
+
+    pieces = UnitPieces(prices, scores, quantities)
+    result = run_solver(pieces.weights, pieces.values, budget, solver="dp")
+    units = pieces.units_by_owner(result.chosen)
+
+    assert all(units[o] <= quantities[o] for o in units)
+    assert sum(prices[o] * u for o, u in units.items()) <= budget
+    optimum = max(
+        sum(s * c for s, c in zip(scores, counts))
+        for counts in product(*(range(q + 1) for q in quantities))
+        if sum(p * c for p, c in zip(prices, counts)) <= budget
+    )
+    assert sum(scores[o] * u for o, u in units.items()) == pytest.approx(optimum)
+
+
+def random_pareto_instance(seed: int, n: int = 9):
+    rng = random.Random(seed)
+    weights = [rng.randint(1, 50) * 100 for _ in range(n)]
+    values = [round(rng.uniform(0, 100), 2) for _ in range(n)]
+    co2 = [round(rng.uniform(0.05, 3.0), 3) for _ in range(n)]
+    budget = rng.randint(sum(weights) // 3, sum(weights))
+    return weights, values, co2, budget
+
+
+def brute_force_front(weights, values, co2, budget):
+    """(costo, valor, CO2) de las canastas no dominadas"""
+    baskets = set()
+    for take in product((0, 1), repeat=len(weights)):
+        cost = sum(w for w, t in zip(weights, take) if t)
+        if cost <= budget:
+            baskets.add((
+                cost,
+                round(sum(v for v, t in zip(values, take) if t), 6),
+                round(sum(c for c, t in zip(co2, take) if t), 6),
+            ))
+    return {
+        a for a in baskets
+        if not any(b != a and b[0] <= a[0] and b[1] >= a[1] and b[2] <= a[2] for b in baskets)
+    }
+
+
+def label_totals(label, weights, values, co2):
+    return (
+        sum(weights[i] for i in label.chosen),
+        sum(values[i] for i in label.chosen),
+        sum(co2[i] for i in label.chosen),
+    )
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pareto_front_is_exact_with_a_fine_grid(seed):
+    weights, values, co2, budget = random_pareto_instance(seed)
+    front, epsilon = pareto_front(weights, values, co2, budget, epsilon=1e-9)
+
+    expected = brute_force_front(weights, values, co2, budget)
+    got = {(label.cost, round(label.value, 6), round(label.co2, 6)) for label in front}
+    assert epsilon == 1e-9
+    assert got == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pareto_front_covers_exact_front_within_epsilon(seed):
+    weights, values, co2, budget = random_pareto_instance(seed)
+    epsilon = 0.05
+    front, used = pareto_front(weights, values, co2, budget, epsilon=epsilon)
+    assert used == epsilon
+
+    for label in front:
+        cost, value, emissions = label_totals(label, weights, values, co2)
+        assert cost <= budget
+        assert (label.cost, label.value, label.co2) == pytest.approx((cost, value, emissions))
+    costs = [label.cost for label in front]
+    assert costs == sorted(costs)
+
+    # Cada pieza puede perder a lo más un factor (1 + ε) por eje en la
+    # grilla logarítmica de log1p (el CO2 en gramos)
+    slack = (1 + epsilon) ** len(weights)
+    for cost, value, emissions in brute_force_front(weights, values, co2, budget):
+        assert any(
+            1 + label.cost <= (1 + cost) * slack
+            and 1 + label.value >= (1 + value) / slack
+            and 1 + label.co2 * 1000 <= (1 + emissions * 1000) * slack
+            for label in front
+        )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pareto_max_points_thins_along_cost(seed):
+    weights, values, co2, budget = random_pareto_instance(seed, n=10)
+    full, _ = pareto_front(weights, values, co2, budget, epsilon=1e-9)
+    max_points = max(2, len(full) // 3)
+
+    thinned, epsilon = pareto_front(weights, values, co2, budget, epsilon=1e-9, max_points=max_points)
+
+    assert epsilon == 1e-9
+    assert len(thinned) == max_points
+    assert thinned[0].cost == full[0].cost
+    assert thinned[-1].cost == full[-1].cost
+    full_points = {(label.cost, label.value, label.co2) for label in full}
+    assert all((label.cost, label.value, label.co2) in full_points for label in thinned)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_results_thins_breakpoints_along_budget(seed):
+    weights, values, budget = random_instance(seed, n=12)
+    solution = solve_dp(weights, values, sum(weights))
+    breakpoints = solution.breakpoints()
+    max_points = max(2, len(breakpoints) // 4)
+
+    results = sweep_results(solution, weights, max_points=max_points)
+
+    budgets = [b for b, _ in results]
+    assert len(results) == max_points
+    assert budgets == sorted(set(budgets))
+    assert budgets[0] == breakpoints[0] and budgets[-1] == breakpoints[-1]
+    assert set(budgets) <= set(breakpoints)
+    assert len(sweep_results(solution, weights)) == len(breakpoints)
+    in_worker = solve_dp_sweep(weights, values, sum(weights), max_points=max_points)
+    assert [(b, r.chosen) for b, r in in_worker] == [(b, r.chosen) for b, r in results]
@@ -0,0 +1,101 @@
+"""
+NutrientRecord frente al dict de nutriments: el score y la categorización
+deben dar lo mismo leyendo el dict, el registro o la fila guardada.
+"""
+
+import json
+import random
+
+import pytest
+
+from app.repositories.product_repository import ProductRepository
+from app.services.impact_service import EnvironmentalImpactService
+from app.services.nutrients import TYPED_NUTRIENTS, NutrientRecord
+from app.services.sustainability_service import SustainabilityService
+
+PREFIX = "7803"
+
+
+def random_nutriments(seed: int) -> dict:
+    rng = random.Random(seed)
+    nutriments = {}
+    for key in TYPED_NUTRIENTS:
+        roll = rng.random()
+        if roll < 0.2:
+            continue
+        if roll < 0.3:
+            nutriments[key] = 0
+        elif key == "nova-group":
+            nutriments[key] = rng.randint(1, 4)
+        else:
+            nutriments[key] = round(rng.uniform(0, 40 if key != "energy-kcal_100g" else 900), 2)
+    if rng.random() < 0.5:
+        # Claves que no usa el score: van solo al blob comprimido
+        nutriments["fiber_100g"] = round(rng.uniform(0, 10), 2)
+        nutriments["nutrition-score-fr"] = rng.randint(-5, 25)
+    return nutriments
+
+
+def save(barcode: str, name: str, nutriments: dict):
+    ProductRepository.save({
+        "barcode": barcode, "name": name, "brand": "Paridad", "nutriments": nutriments,
+        "sustainability_score": SustainabilityService.compute_score(nutriments), "price": 990,
+    })
+
+
+SEEDS = range(40)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_record_matches_dict(seed):
+    nutriments = random_nutriments(seed)
+    record = NutrientRecord.from_nutriments(nutriments)
+
+    assert SustainabilityService.compute_score(record) == SustainabilityService.compute_score(nutriments)
+    assert EnvironmentalImpactService.categorize("Producto", record) == \
+        EnvironmentalImpactService.categorize("Producto", nutriments)
+    assert bool(record) == bool(nutriments)
+    for key in TYPED_NUTRIENTS:
+        assert (key in record) == (nutriments.get(key) is not None)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_saved_row_matches_dict(database, seed):
+    nutriments = random_nutriments(seed)
+    barcode = f"{PREFIX}{seed:09d}"
+    save(barcode, "Producto", nutriments)
+
+    row = ProductRepository.get(barcode)
+    record = NutrientRecord.from_row(row)
+
+    assert SustainabilityService.compute_score(record) == row.sustainability_score
+    assert EnvironmentalImpactService.categorize(row.name, record) == \
+        EnvironmentalImpactService.categorize(row.name, nutriments)
+    assert record.to_dict() == ({k: v for k, v in nutriments.items() if k in TYPED_NUTRIENTS} if nutriments else None)
+    assert NutrientRecord.full_nutriments(ProductRepository.get(barcode, with_nutriments=True)) == (nutriments or None)
+
+
+def test_legacy_json_row(database):
+    nutriments = {"nova-group": 4, "sugars_100g": 30.5, "protein": 20, "fiber_100g": 2}
+    barcode = f"{PREFIX}900000001"
+    save(barcode, "Carne legado", {})
+    ProductRepository.update_many([{"barcode": barcode, "nutrients_json": json.dumps(nutriments)}])
+
+    row = ProductRepository.get(barcode, with_nutriments=True)
+    record = NutrientRecord.from_row(row)
+
+    assert SustainabilityService.compute_score(record) == SustainabilityService.compute_score(nutriments)
+    assert record.get("protein") == 20 and "salt_100g" not in record
+    assert NutrientRecord.full_nutriments(row) == nutriments
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ({"nova-group": "4", "sugars_100g": "12.5"}, {"nova-group": 4, "sugars_100g": 12.5}),
+    ({"nova-group": 3.0, "salt_100g": True}, {"nova-group": 3}),
+    ({"protein": "n/a", "fiber_100g": 3}, {}),
+])
+def test_from_nutriments_coerces_numbers(raw, expected):
+    record = NutrientRecord.from_nutriments(raw)
+
+    assert record.to_dict() == expected
+    assert bool(record)
@@ -0,0 +1,89 @@
+"""ProductCache: TTL, caché negativa y LRU, con un reloj controlado"""
+
+import pytest
+
+from app.models.product import ProductModel
+from app.services import product_cache
+from app.services.product_cache import ProductCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(product_cache.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(ProductCache, "TTL", 60.0)
+    monkeypatch.setattr(ProductCache, "NEGATIVE_TTL", 10.0)
+    monkeypatch.setattr(ProductCache, "MAX_SIZE", 3)
+    ProductCache.clear()
+    yield clock
+    ProductCache.clear()
+
+
+def product(barcode: str) -> ProductModel:
+    return ProductModel(barcode=barcode, name=f"Producto {barcode}", brand=None, price=1000)
+
+
+def test_entry_expires_after_ttl(clock):
+    ProductCache.put("1", product("1"))
+
+    clock.now += 59
+    assert ProductCache.get("1").name == "Producto 1"
+    clock.now += 1
+    assert ProductCache.get("1") is ProductCache.MISS
+    assert ProductCache.stats()["size"] == 0
+    assert (ProductCache.hits, ProductCache.misses) == (1, 1)
+
+
+def test_negative_entry_uses_its_own_ttl(clock):
+    ProductCache.put("404", None)
+
+    clock.now += 9
+    assert ProductCache.get("404") is None
+    clock.now += 1
+    assert ProductCache.get("404") is ProductCache.MISS
+    assert (ProductCache.negative_hits, ProductCache.misses) == (1, 1)
+
+
+def test_least_recently_used_is_evicted(clock):
+    for barcode in "123":
+        ProductCache.put(barcode, product(barcode))
+    ProductCache.get("1")
+
+    ProductCache.put("4", product("4"))
+
+    assert ProductCache.get("2") is ProductCache.MISS
+    assert all(ProductCache.get(b) is not ProductCache.MISS for b in "134")
+    assert ProductCache.evictions == 1
+
+
+def test_put_refreshes_the_ttl(clock):
+    ProductCache.put("1", product("1"))
+    clock.now += 50
+    ProductCache.put("1", product("1").model_copy(update={"price": 1200}))
+
+    clock.now += 50
+    assert ProductCache.get("1").price == 1200
+
+
+def test_callers_get_copies(clock):
+    original = product("1")
+    ProductCache.put("1", original)
+    original.price = 1
+    ProductCache.get("1").price = 2
+
+    assert ProductCache.get("1").price == 1000
+
+
+def test_disabled_cache_stores_nothing(clock, monkeypatch):
+    monkeypatch.setattr(ProductCache, "MAX_SIZE", 0)
+    ProductCache.put("1", product("1"))
+
+    assert ProductCache.get("1") is ProductCache.MISS
@@ -0,0 +1,169 @@
+"""
+Stale-while-revalidate: una fila vencida se responde sin esperar a
+OpenFoodFacts (simulado con httpx.MockTransport) y el worker de
+ProductRefresher la actualiza en segundo plano.
+"""
+
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+import pytest
+
+from app.repositories.product_repository import ProductRepository
+from app.services.openfoodfacts_service import OpenFoodFactsService
+from app.services.product_cache import ProductCache
+from app.services.product_refresher import ProductRefresher
+
+PREFIX = "7804"
+
+
+class Upstream:
+    """OpenFoodFacts simulado: nombre actual por barcode (None = 404)"""
+
+    def __init__(self, names: dict, latency: float = 0.0):
+        self.names = names
+        self.latency = latency
+        self.requests = []
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        barcode = request.url.path.rsplit("/", 1)[-1].removesuffix(".json")
+        self.requests.append(barcode)
+        await asyncio.sleep(self.latency)
+        name = self.names.get(barcode)
+        if name is None:
+            return httpx.Response(404)
+        return httpx.Response(200, json={"status": 1, "product": {
+            "product_name": name, "brands": "Fresca", "nutriments": {"sugars_100g": 4, "nova-group": 1},
+        }})
+
+
+def save_row(barcode: str, name: str, age: float, ttl: int = 100):
+    ProductRepository.save({
+        "barcode": barcode, "name": name, "brand": "Fresca", "nutriments": {"sugars_100g": 4},
+        "sustainability_score": 98.0, "price": 1500,
+        "fetched_at": time.time() - age, "ttl_seconds": ttl,
+    })
+
+
+async def with_refresher(upstream: Upstream, body):
+    await OpenFoodFactsService.startup(httpx.MockTransport(upstream.handle))
+    await ProductRefresher.startup(OpenFoodFactsService.refresh_product)
+    try:
+        return await body()
+    finally:
+        await ProductRefresher.shutdown()
+        await OpenFoodFactsService.shutdown()
+
+
+async def drain(timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while ProductRefresher._queued and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    assert not ProductRefresher._queued
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(database, monkeypatch):
+    monkeypatch.setattr(ProductRefresher, "REFRESH_RATE", 0)
+    ProductCache.clear()
+    yield
+    ProductCache.clear()
+
+
+def test_stale_row_is_served_then_refreshed():
+    barcode = f"{PREFIX}000000001"
+    save_row(barcode, "Yogurt viejo", age=500)
+    upstream = Upstream({barcode: "Yogurt nuevo"}, latency=0.2)
+
+    async def body():
+        started = time.monotonic()
+        served = await OpenFoodFactsService.get_product(barcode)
+        elapsed = time.monotonic() - started
+        await drain()
+        return served, elapsed
+
+    served, elapsed = asyncio.run(with_refresher(upstream, body))
+
+    assert served.name == "Yogurt viejo"
+    assert elapsed < upstream.latency
+    assert upstream.requests == [barcode]
+    row = ProductRepository.get(barcode)
+    assert row.name == "Yogurt nuevo"
+    assert not ProductRefresher.is_stale(row)
+    assert ProductCache.get(barcode).name == "Yogurt nuevo"
+
+
+def test_fresh_row_is_not_refreshed():
+    barcode = f"{PREFIX}000000002"
+    save_row(barcode, "Queso", age=10)
+    upstream = Upstream({barcode: "Queso nuevo"})
+
+    async def body():
+        served = await OpenFoodFactsService.get_product(barcode)
+        await drain()
+        return served
+
+    assert asyncio.run(with_refresher(upstream, body)).name == "Queso"
+    assert upstream.requests == []
+
+
+def test_stale_batch_is_refreshed_once_per_barcode():
+    barcodes = [f"{PREFIX}00000001{i}" for i in range(3)]
+    for barcode in barcodes:
+        save_row(barcode, "Pan", age=500)
+    upstream = Upstream({barcode: "Pan nuevo" for barcode in barcodes}, latency=0.05)
+
+    async def body():
+        known = {}
+        for _ in range(3):
+            ProductCache.clear()
+            known, missing = await OpenFoodFactsService.get_known_products(barcodes)
+            assert missing == []
+        await drain()
+        return known
+
+    known = asyncio.run(with_refresher(upstream, body))
+
+    assert {product.name for product in known.values()} == {"Pan"}
+    assert sorted(upstream.requests) == sorted(barcodes)
+    assert {ProductRepository.get(b).name for b in barcodes} == {"Pan nuevo"}
+
+
+def test_product_gone_upstream_keeps_row_and_resets_age():
+    barcode = f"{PREFIX}000000003"
+    save_row(barcode, "Descontinuado", age=500)
+    upstream = Upstream({})
+
+    async def body():
+        served = await OpenFoodFactsService.get_product(barcode)
+        await drain()
+        return served
+
+    assert asyncio.run(with_refresher(upstream, body)).name == "Descontinuado"
+    row = ProductRepository.get(barcode)
+    assert row.name == "Descontinuado"
+    assert not ProductRefresher.is_stale(row)
+
+
+def test_prefresh_schedules_hot_rows_close_to_expiry(monkeypatch):
+    hot, cold, young = (f"{PREFIX}00000002{i}" for i in range(3))
+    save_row(hot, "Leche", age=90)
+    save_row(cold, "Leche", age=90)
+    save_row(young, "Leche", age=10)
+    monkeypatch.setattr(ProductRefresher, "PREFRESH_TOP", 2)
+    monkeypatch.setattr(ProductRefresher, "_requests", Counter())
+    for barcode, count in ((hot, 5), (young, 4), (cold, 1)):
+        for _ in range(count):
+            ProductRefresher.record_request(barcode)
+    upstream = Upstream({hot: "Leche nueva", cold: "Leche nueva", young: "Leche nueva"})
+
+    async def body():
+        scheduled = await ProductRefresher.prefresh_top()
+        await drain()
+        return scheduled
+
+    assert asyncio.run(with_refresher(upstream, body)) == 1
+    assert upstream.requests == [hot]
+    assert ProductRefresher._requests == {hot: 2, young: 2}
@@ -0,0 +1,73 @@
+"""ProductSearchRepository.search sobre la BD de la corrida (ver conftest)"""
+
+import asyncio
+
+import pytest
+
+from app.repositories.product_repository import ProductRepository
+from app.repositories.search_repository import ProductSearchRepository
+
+PREFIX = "7802"
+
+
+def product(i: int, name: str, category: str, score: float) -> dict:
+    return {
+        "barcode": f"{PREFIX}{i:09d}",
+        "name": name,
+        "brand": "Buscable",
+        "nutriments": {"sugars_100g": i % 10},
+        "sustainability_score": score,
+        "price": 1000 + i,
+        "category": category,
+        "impact": None,
+    }
+
+
+@pytest.fixture(scope="module")
+def catalog(database):
+    products = [product(i, f"Leche entera {i}", "lacteos-busqueda", 40 + i) for i in range(25)]
+    products += [product(100 + i, f"Galletas {i}", "snacks-busqueda", 10 + i) for i in range(5)]
+    ProductRepository.save_many(products)
+    return products
+
+
+def search(**kwargs):
+    return asyncio.run(ProductSearchRepository.search(**kwargs))
+
+
+@pytest.mark.parametrize("offset", [0, 10, 20])
+def test_text_search_total_is_stable_across_pages(catalog, offset):
+    total, hits = search(q="leche ent", limit=10, offset=offset)
+
+    assert total == 25
+    assert len(hits) == min(10, 25 - offset)
+
+
+@pytest.mark.parametrize("q", [None, "leche"])
+def test_total_past_the_last_page(catalog, q):
+    total, hits = search(q=q, category="lacteos-busqueda", limit=10, offset=1000)
+
+    assert hits == []
+    assert total == 25
+
+
+def test_filtered_search_orders_by_score(catalog):
+    total, hits = search(category="lacteos-busqueda", min_score=50, limit=5)
+
+    assert total == 15
+    scores = [hit["sustainability_score"] for hit in hits]
+    assert scores == sorted(scores, reverse=True) and scores[0] == 64
+
+
+def test_nutrient_filter(catalog):
+    total, hits = search(category="lacteos-busqueda", max_nutrients={"sugars_100g": 2}, limit=100)
+
+    assert total == len(hits) == 9
+    assert all(int(hit["barcode"][-1]) <= 2 for hit in hits)
+
+
+def test_catalog_only_names_are_found(catalog):
+    total, hits = search(q="arroz")
+
+    assert total == 1
+    assert hits[0]["barcode"] == "7801000000001" and hits[0]["name"] == "Arroz grado 1"
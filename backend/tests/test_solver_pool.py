@@ -0,0 +1,110 @@
+"""
+SolverPool con un worker real (spawn): timeouts, cola llena, worker caído
+y cierre con solves en curso.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import time
+
+import pytest
+
+from app.services.knapsack_solvers import SolverTimeout, run_solver
+from app.services.solver_pool import SolverPool, SolverPoolBusy
+
+
+def sleepy(seconds: float, deadline=None):
+    time.sleep(seconds)
+    return seconds
+
+
+def kill_self(deadline=None):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(SolverPool, "HARD_TIMEOUT_GRACE", 0.0)
+
+    def run(test):
+        async def main():
+            await SolverPool.startup(workers=1)
+            try:
+                return await test()
+            finally:
+                await SolverPool.shutdown()
+        return asyncio.run(main())
+
+    return run
+
+
+def test_runs_in_process_without_startup():
+    result = asyncio.run(SolverPool.run(run_solver, [3, 4, 5], [1.0, 2.0, 3.0], 8))
+    assert sorted(result.chosen) == [0, 2]
+
+
+def test_solve_in_worker(pool):
+    async def test():
+        result = await SolverPool.run(run_solver, [3, 4, 5], [1.0, 2.0, 3.0], 8)
+        await asyncio.sleep(0.05)
+        return result, SolverPool.stats()["in_flight"]
+
+    result, in_flight = pool(test)
+    assert sorted(result.chosen) == [0, 2]
+    assert in_flight == 0
+
+
+def test_hard_timeout_raises_solver_timeout(pool):
+    async def test():
+        with pytest.raises(SolverTimeout):
+            await SolverPool.run(sleepy, 1.0, time_limit=0.1)
+
+    pool(test)
+
+
+def test_full_queue_raises_busy(pool, monkeypatch):
+    monkeypatch.setattr(SolverPool, "MAX_QUEUE", 1)
+
+    async def test():
+        first = asyncio.ensure_future(SolverPool.run(sleepy, 0.5, time_limit=5.0))
+        await asyncio.sleep(0.05)
+        with pytest.raises(SolverPoolBusy) as busy:
+            await SolverPool.run(sleepy, 0.0)
+        assert busy.value.retry_after >= 1
+        assert await first == 0.5
+
+    pool(test)
+
+
+def test_recovers_after_a_worker_dies(pool):
+    async def test():
+        os.kill(next(iter(SolverPool._executor._processes)), signal.SIGKILL)
+        await asyncio.sleep(0.3)
+        result = await SolverPool.run(run_solver, [3, 4, 5], [1.0, 2.0, 3.0], 8)
+        assert sorted(result.chosen) == [0, 2]
+
+        # Un solve que mata a su worker dos veces termina en SolverTimeout (→ greedy)
+        with pytest.raises(SolverTimeout):
+            await SolverPool.run(kill_self)
+        result = await SolverPool.run(run_solver, [3, 4, 5], [1.0, 2.0, 3.0], 8)
+        await asyncio.sleep(0.05)
+        assert sorted(result.chosen) == [0, 2]
+        assert SolverPool.stats()["in_flight"] == 0
+
+    pool(test)
+
+
+def test_shutdown_with_solves_in_flight_does_not_touch_closed_loop(caplog):
+    async def main():
+        await SolverPool.startup(workers=1)
+        task = asyncio.ensure_future(SolverPool.run(sleepy, 0.3, time_limit=5.0))
+        await asyncio.sleep(0.05)
+        await SolverPool.shutdown()
+        task.cancel()
+
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(main())
+        time.sleep(0.6)  # el worker termina después de cerrado el loop
+    assert "Event loop is closed" not in caplog.text